@@ -8,13 +8,11 @@ from ...models.user import User
 from ...services.auth_service import get_current_user
 from ...services.email_service import email_service
 from ...services.label_service import EmailLabelService
-from ...services.vector_db_service import VectorDBService
 
 router = APIRouter()
 
 # Create instance of label service
 label_service = EmailLabelService()
-vector_db_service = VectorDBService()
 
 
 @router.get("/analytics/summary")
@@ -6,6 +6,7 @@ import re
 from dateutil import parser
 import base64
 import json
+import hmac
 import logging
 import asyncio
 import os
@@ -16,40 +17,85 @@ logger = logging.getLogger(__name__)
 from app.db.database import get_db
 from app.models.user import User
 from app.models.gmail_rate_limit import GmailRateLimit
+from app.models.auto_reply_config import UserAutoReplyConfig
 from app.services.auth_service import get_current_user
 from app.services.auto_reply_service import AutoReplyManager
 from app.schemas.auto_reply import AutoReplyConfig, AutoReplyResponse, AutoReplyStatus
 from app.services.email_service import build_gmail_service, get_gmail_service
 from app.services.thread_monitoring_service import ThreadMonitoringService
-from app.services.vector_db_service import vector_db
+from app.tasks.notification_scheduler import wake_scheduler
 
 router = APIRouter(prefix="/auto-reply", tags=["auto-reply"])
 
-# In-memory store for simple configuration persistence
-# In a production app, this would be stored in a database
-auto_reply_configs = {}
+# Shared secret the Gmail webhook must send in X-Webhook-Secret (if configured)
+GMAIL_WEBHOOK_SECRET = os.getenv("GMAIL_WEBHOOK_SECRET", "").encode()
 
 
 # Helper functions for auto-reply configuration
 def get_auto_reply_config(user_id: int, db: Session) -> AutoReplyConfig:
     """Get the auto-reply configuration for the user"""
-    # In a real implementation, you would fetch this from a database
-    # For this example, we use an in-memory store
-    if user_id not in auto_reply_configs:
-        auto_reply_configs[user_id] = AutoReplyConfig(
+    record = db.get(UserAutoReplyConfig, user_id)
+    if record is None:
+        return AutoReplyConfig(
             enabled=True,
             max_threads_per_check=20,
             auto_reply_signature=None,
             is_using_gmail_responder=False,
         )
-    return auto_reply_configs[user_id]
+
+    return AutoReplyConfig(
+        enabled=record.enabled,
+        max_threads_per_check=record.max_threads_per_check,
+        auto_reply_signature=record.auto_reply_signature,
+        is_using_gmail_responder=record.is_using_gmail_responder,
+        is_using_push_notifications=record.is_using_push_notifications,
+        push_notification_expiry=(
+            record.push_notification_expiry.isoformat()
+            if record.push_notification_expiry
+            else None
+        ),
+        push_notification_history_id=record.push_notification_history_id,
+        push_notification_topic=record.push_notification_topic,
+    )
+
+
+def _parse_push_expiry(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO push notification expiry, rejecting malformed values with a 400"""
+    if not value:
+        return None
+    try:
+        expiry = parser.isoparse(value)
+    except (ValueError, OverflowError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid push_notification_expiry: {value}",
+        )
+    # Naive timestamps are taken as UTC, like the scheduler does
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry
 
 
 def save_auto_reply_config(user_id: int, config: AutoReplyConfig, db: Session):
     """Save the auto-reply configuration for the user"""
-    # In a real implementation, you would save this to a database
-    # For this example, we use an in-memory store
-    auto_reply_configs[user_id] = config
+    # Validate before touching the session so a bad value leaves nothing pending
+    push_notification_expiry = _parse_push_expiry(config.push_notification_expiry)
+
+    record = db.get(UserAutoReplyConfig, user_id)
+    if record is None:
+        record = UserAutoReplyConfig(user_id=user_id)
+        db.add(record)
+
+    record.enabled = config.enabled
+    record.max_threads_per_check = config.max_threads_per_check
+    record.auto_reply_signature = config.auto_reply_signature
+    record.is_using_gmail_responder = config.is_using_gmail_responder
+    record.is_using_push_notifications = config.is_using_push_notifications
+    # Stored as a timestamp so the scheduler can filter on it in SQL
+    record.push_notification_expiry = push_notification_expiry
+    record.push_notification_history_id = config.push_notification_history_id
+    record.push_notification_topic = config.push_notification_topic
+    db.commit()
 
 
 async def get_google_creds(user_id: int, db: Session):
@@ -701,39 +747,13 @@ async def setup_realtime_notifications(
     try:
         logger.info(f"Setting up Gmail push notifications for user ID: {user.id}")
 
-        # Get Google credentials
-        credentials = await get_google_creds(user.id, db)
-        service = build_gmail_service(credentials)
-
-        # Create a user-specific topic name
-        # This ensures each user has their own notification channel
-        project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "default")
-        topic = f"projects/{project_id}/topics/gmail-notifications-user-{user.id}"
-
-        # Register for notifications from Gmail with improved filter
-        # Using UNREAD filter ensures we only get notifications for new emails
-        watch_request = {
-            "topicName": topic,
-            "labelIds": ["INBOX", "UNREAD"],
-            "labelFilterAction": "include",
-        }
-
         try:
-            # Call the Gmail API to watch the user's inbox
-            watch_response = (
-                service.users().watch(userId="me", body=watch_request).execute()
-            )
-
-            # Get expiration time (in milliseconds since epoch) and convert to datetime
-            expiration_ms = int(watch_response.get("expiration", 0))
-            expiration_date = datetime.fromtimestamp(expiration_ms / 1000, timezone.utc)
+            # Watch the user's inbox and store the watch details in their config
+            watch = AutoReplyManager.register_gmail_watch(user.id, db)
+            expiration_date = watch["expiration"]
 
-            # Store the watch details in the user's auto-reply config
-            config = get_auto_reply_config(user.id, db)
-            config.is_using_push_notifications = True
-            config.push_notification_expiry = expiration_date.isoformat()
-            config.push_notification_history_id = watch_response.get("historyId")
-            save_auto_reply_config(user.id, config, db)
+            # Let the refresh scheduler account for the new expiry
+            wake_scheduler()
 
             # Log success
             logger.info(
@@ -749,9 +769,9 @@ async def setup_realtime_notifications(
                 "success": True,
                 "message": f"Gmail push notifications set up successfully. Valid for {days_valid} days.",
                 "details": {
-                    "historyId": watch_response.get("historyId"),
+                    "historyId": watch["historyId"],
                     "expiration": expiration_date.isoformat(),
-                    "topic": topic,
+                    "topic": watch["topic"],
                 },
             }
 
@@ -797,8 +817,11 @@ async def gmail_webhook(
         acknowledge_response = {"success": True, "message": "Webhook received"}
 
         # Validate the request
-        webhook_secret = os.getenv("GMAIL_WEBHOOK_SECRET")
-        if webhook_secret and request.headers.get("X-Webhook-Secret") != webhook_secret:
+        # (compare_digest takes the same time wherever the values differ, so
+        # the secret can't be recovered by timing the comparison)
+        if GMAIL_WEBHOOK_SECRET and not hmac.compare_digest(
+            request.headers.get("X-Webhook-Secret", "").encode(), GMAIL_WEBHOOK_SECRET
+        ):
             logger.warning("Webhook called with invalid secret")
             # Still return success to avoid exposing internal validation
             return acknowledge_response
@@ -480,10 +480,10 @@ async def get_similar_threads(
             return {"thread_id": thread_id, "similar_threads": [], "count": 0}
 
         # Search similar threads in vector database, filtered by target label
-        from app.services.vector_db_service import vector_db
+        from app.services.vector_db_service import get_vector_db
 
-        results = vector_db.search_threads(
-            user.id, thread_embedding, top_k * 3
+        results = get_vector_db().search_threads(
+            user.id, thread_embedding, top_k * 3, include_metadata=False
         )  # Fetch more to ensure we have enough after filtering
 
         # Filter results to only include threads with the target label
@@ -494,6 +494,11 @@ async def get_similar_threads(
                 if len(filtered_results) >= top_k:
                     break
 
+        # Fetch metadata only for the threads that are kept
+        filtered_results = get_vector_db().add_thread_metadata(
+            user.id, filtered_results
+        )
+
         # For each result, add classification data
         for result in filtered_results:
             try:
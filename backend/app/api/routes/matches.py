@@ -1,4 +1,5 @@
 from typing import Dict, Any, List, Optional
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -69,6 +70,12 @@ async def get_match_history(
         ..., description="Match type: 'job_to_candidate' or 'candidate_to_job'"
     ),
     limit: int = Query(10, description="Maximum number of matches to return"),
+    before: Optional[datetime] = Query(
+        None, description="Only return matches made before this timestamp"
+    ),
+    before_id: Optional[int] = Query(
+        None, description="match_id of the last match returned, to break ties"
+    ),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -81,6 +88,7 @@ async def get_match_history(
     - thread_id: The ID of the thread
     - match_type: The type of match to retrieve ('job_to_candidate' or 'candidate_to_job')
     - limit: Maximum number of matches to return
+    - before, before_id: Cursor for the next page; pass the `matched_at` and `match_id` of the last match returned
 
     Returns a list of previous matches ordered by recency.
     """
@@ -91,7 +99,13 @@ async def get_match_history(
         )
 
     matches = await match_service.get_previous_matches(
-        thread_id=thread_id, match_type=match_type, user=user, db=db, limit=limit
+        thread_id=thread_id,
+        match_type=match_type,
+        user=user,
+        db=db,
+        limit=limit,
+        before_matched_at=before,
+        before_id=before_id,
     )
 
     return matches
@@ -29,6 +29,8 @@ VALID_CATEGORIES = [
     "Other",
     "Follow-ups",
 ]
+# Set of the same categories for membership checks (the list keeps display order)
+VALID_CATEGORY_SET = frozenset(VALID_CATEGORIES)
 
 VALID_PROMPT_TYPES = ["classification", "auto_reply"]
 
@@ -112,7 +114,7 @@ async def create_prompt(
             )
 
         # Validate the category
-        if category not in VALID_CATEGORIES:
+        if category not in VALID_CATEGORY_SET:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}",
@@ -227,7 +229,7 @@ async def get_prompt(
     """Get a specific custom prompt"""
     try:
         # Validate the category
-        if category not in VALID_CATEGORIES:
+        if category not in VALID_CATEGORY_SET:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid category. Must be one of: {', '.join(VALID_CATEGORIES)}",
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -7,17 +8,51 @@ from app.core.config import settings
 # Get database URL from environment or settings
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", settings.DATABASE_URL)
 
+# Connection pool sizing (SQLite doesn't use a QueuePool, so it's left alone)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = 1800  # Seconds before a pooled connection is replaced
+
 # Adjust connect_args for SQLite if needed
 connect_args = {}
+pool_args = {}
 if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
+else:
+    pool_args = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,  # Drop connections the server has closed
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
 
 # Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **pool_args)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for code running on the event loop (e.g. the scheduler), using
+# the async driver for the same database
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(
+        make_url(SQLALCHEMY_DATABASE_URL).set(drivername="sqlite+aiosqlite")
+    )
+else:
+    async_engine = create_async_engine(
+        make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg"),
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+# Create AsyncSessionLocal class
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
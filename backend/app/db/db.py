@@ -30,9 +30,8 @@ class Database:
                 result = connection.execute(text(query_str))
                 
             if result.returns_rows:
-                # Convert to list of dictionaries
-                columns = result.keys()
-                return [dict(zip(columns, row)) for row in result.fetchall()]
+                # Row mappings are already dict-like, no need to copy each row
+                return result.mappings().all()
             return []
     
     def execute_many(self, query_str, params_list):
@@ -49,6 +48,7 @@ class Database:
         try:
             with self.engine.connect() as connection:
                 connection.execute(text(query_str), params_list)
+                connection.commit()
             return True
         except Exception as e:
             print(f"Database execution error: {str(e)}")
@@ -72,9 +72,7 @@ class Database:
                 result = connection.execute(text(query_str))
                 
             if result.returns_rows:
-                row = result.fetchone()
-                if row:
-                    return dict(zip(result.keys(), row))
+                return result.mappings().first()
             return None
             
     def execute(self, query, params=None):
@@ -8,4 +8,5 @@ from app.models import (
     match,
     background_service,
     custom_prompt,
+    auto_reply_config,
 )
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class UserAutoReplyConfig(Base):
+    """Auto-reply configuration for a user (stored form of schemas.AutoReplyConfig)"""
+
+    __tablename__ = "auto_reply_configs"
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    enabled = Column(Boolean, default=True, nullable=False)
+    max_threads_per_check = Column(Integer, default=20, nullable=False)
+    auto_reply_signature = Column(String, nullable=True)
+    is_using_gmail_responder = Column(Boolean, default=False, nullable=False)
+    is_using_push_notifications = Column(Boolean, default=False, nullable=False)
+    push_notification_expiry = Column(DateTime(timezone=True), nullable=True)
+    push_notification_history_id = Column(String, nullable=True)
+    push_notification_topic = Column(String, nullable=True)
+    # When a scheduler instance claimed this row for a refresh
+    refreshing_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        # Lets the push notification scheduler find expiring registrations
+        # without scanning every user
+        Index(
+            "idx_arc_push_expiry",
+            "is_using_push_notifications",
+            "push_notification_expiry",
+        ),
+    )
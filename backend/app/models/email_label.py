@@ -7,6 +7,7 @@ from sqlalchemy import (
     Text,
     Boolean,
     JSON,
+    Index,
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -62,6 +63,16 @@ class ThreadLabel(Base):
     label = relationship("EmailLabel", back_populates="thread_labels")
     user = relationship("User", backref="thread_labels")
 
+    __table_args__ = (
+        # Covers category lookups for a user's thread, highest confidence first
+        Index(
+            "idx_threadlabel_user_thread_conf",
+            "user_id",
+            "thread_id",
+            confidence.desc(),
+        ),
+    )
+
 
 class LabelFeedback(Base):
     """User feedback on label suggestions for model improvement"""
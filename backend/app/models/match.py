@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    DateTime,
+    ForeignKey,
+    Text,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -24,5 +33,25 @@ class JobCandidateMatch(Base):
     # Relationships
     user = relationship("User", back_populates="matches")
 
+    # Composite indexes for keyset pagination of match history (newest first)
+    __table_args__ = (
+        Index(
+            "idx_matches_job_history",
+            "user_id",
+            "match_type",
+            "job_thread_id",
+            matched_at.desc(),
+            id.desc(),
+        ),
+        Index(
+            "idx_matches_candidate_history",
+            "user_id",
+            "match_type",
+            "candidate_thread_id",
+            matched_at.desc(),
+            id.desc(),
+        ),
+    )
+
     def __repr__(self):
         return f"<JobCandidateMatch id={self.id} job={self.job_thread_id} candidate={self.candidate_thread_id} score={self.similarity_score:.2f}>"
@@ -14,6 +14,7 @@ import requests
 from app.db.database import get_db
 from app.models.user import User
 from app.models.gmail_rate_limit import GmailRateLimit
+from app.models.auto_reply_config import UserAutoReplyConfig
 
 # IMPORTANT: Do not import from app.api.routes.auto_reply here to avoid circular imports
 # Use runtime imports where needed inside each function instead
@@ -22,13 +23,12 @@ from app.models.gmail_rate_limit import GmailRateLimit
 from app.services.email_service import get_thread, get_gmail_service, send_email
 from app.services.auth_service import get_current_user, get_google_creds
 from app.services.embedding_service import create_thread_embedding
-from app.services.vector_db_service import vector_db
+from app.services.vector_db_service import get_vector_db
 from app.services.email_classifier_service import email_classifier
 from app.schemas.email import SendEmailRequest
 from app.services.match_service import match_service
 from app.db.database import SessionLocal
 from app.utils.thread_utils import get_thread_category
-from app.core.config import settings
 from app.services.thread_monitoring_service import ThreadMonitoringService
 
 # Initialize OpenAI client
@@ -301,7 +301,7 @@ class AutoReplyManager:
 
             # First try with category filtering
             try:
-                similar_threads = vector_db.search_threads(
+                similar_threads = get_vector_db().search_threads(
                     user.id,
                     query_embedding,
                     MAX_CONTEXT_THREADS,
@@ -313,7 +313,7 @@ class AutoReplyManager:
                     print(
                         f"No {complementary_category.lower()} threads found, falling back to general search"
                     )
-                    similar_threads = vector_db.search_threads(
+                    similar_threads = get_vector_db().search_threads(
                         user.id, query_embedding, MAX_CONTEXT_THREADS
                     )
             except Exception as search_error:
@@ -321,7 +321,7 @@ class AutoReplyManager:
                     f"Error during vector search: {str(search_error)}, falling back to general search"
                 )
                 # Fall back to general search without filtering
-                similar_threads = vector_db.search_threads(
+                similar_threads = get_vector_db().search_threads(
                     user.id, query_embedding, MAX_CONTEXT_THREADS
                 )
 
@@ -740,7 +740,8 @@ Based on this information, draft a helpful and appropriate reply.{' Remember to
         """
         Set up Gmail push notifications for real-time email processing.
 
-        This registers a webhook with Gmail API to receive notifications when new emails arrive.
+        This registers a webhook with Gmail API to receive notifications when new emails arrive
+        (see register_gmail_watch, which also stores the watch in the user's config).
 
         Args:
             user: The user to set up notifications for
@@ -750,36 +751,9 @@ Based on this information, draft a helpful and appropriate reply.{' Remember to
             Dict with setup results
         """
         try:
-            # Get credentials and build service
-            credentials = get_google_creds(user.id, db)
-            service = get_gmail_service(credentials)
-
-            # Create a unique topic name for this user
-            topic_name = f"projects/{settings.google_cloud_project}/topics/gmail-notifications-{user.id}"
-
-            # Set up the webhook
-            webhook_url = (
-                f"{settings.base_url}/api/auto-reply/receive-gmail-push-notification"
-            )
-
-            # Register the webhook for push notifications
-            # Note: The push notification requires a Google Cloud Pub/Sub topic
-            # that must be set up in the Google Cloud Console
-            request = {
-                "labelIds": ["INBOX"],
-                "topicName": topic_name,
-                "labelFilterBehavior": "INCLUDE",
-            }
-
-            # Call the Gmail API to watch for changes
-            watch_response = service.users().watch(userId="me", body=request).execute()
-
-            # Store the watch details for this user
-            expiration = (
-                int(watch_response.get("expiration", 0)) / 1000
-            )  # Convert to seconds
-            expiration_date = datetime.fromtimestamp(expiration, timezone.utc)
-            history_id = watch_response.get("historyId")
+            # Register the watch and store its details in the user's config
+            watch = AutoReplyManager.register_gmail_watch(user.id, db)
+            expiration_date = watch["expiration"]
 
             logger.info(
                 f"Gmail push notifications set up for user {user.id}. Expires: {expiration_date}"
@@ -790,7 +764,7 @@ Based on this information, draft a helpful and appropriate reply.{' Remember to
                 "message": "Gmail push notifications set up successfully",
                 "details": {
                     "expiration": expiration_date.isoformat(),
-                    "historyId": history_id,
+                    "historyId": watch["historyId"],
                 },
             }
 
@@ -801,6 +775,66 @@ Based on this information, draft a helpful and appropriate reply.{' Remember to
                 "message": f"Failed to set up Gmail push notifications: {str(e)}",
             }
 
+    @staticmethod
+    def register_gmail_watch(user_id: int, db: Session) -> Dict[str, Any]:
+        """
+        Register (or renew) the Gmail watch that sends push notifications for the
+        user's inbox, and store its details in the user's auto-reply config.
+
+        Args:
+            user_id: The ID of the user to watch the inbox of
+            db: Database session
+
+        Returns:
+            Dict with the watch's historyId, expiration (datetime) and topic
+
+        Raises:
+            Exception: If the Gmail API call fails
+        """
+        # Get credentials and build service
+        credentials = get_google_creds(user_id, db)
+        service = get_gmail_service(credentials)
+
+        # Create a user-specific topic name
+        # This ensures each user has their own notification channel
+        project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "default")
+        topic = f"projects/{project_id}/topics/gmail-notifications-user-{user_id}"
+
+        # Register for notifications from Gmail with improved filter
+        # Using UNREAD filter ensures we only get notifications for new emails
+        watch_request = {
+            "topicName": topic,
+            "labelIds": ["INBOX", "UNREAD"],
+            "labelFilterAction": "include",
+        }
+
+        # Call the Gmail API to watch the user's inbox
+        watch_response = (
+            service.users().watch(userId="me", body=watch_request).execute()
+        )
+
+        # Get expiration time (in milliseconds since epoch) and convert to datetime
+        expiration_ms = int(watch_response.get("expiration", 0))
+        expiration_date = datetime.fromtimestamp(expiration_ms / 1000, timezone.utc)
+
+        # Store the watch details in the user's auto-reply config, releasing any
+        # refresh claim the push notification scheduler holds on it
+        record = db.get(UserAutoReplyConfig, user_id)
+        if record is None:
+            record = UserAutoReplyConfig(user_id=user_id)
+            db.add(record)
+        record.is_using_push_notifications = True
+        record.push_notification_expiry = expiration_date
+        record.push_notification_history_id = watch_response.get("historyId")
+        record.refreshing_at = None
+        db.commit()
+
+        return {
+            "historyId": watch_response.get("historyId"),
+            "expiration": expiration_date,
+            "topic": topic,
+        }
+
     @staticmethod
     async def process_gmail_push_notification(
         user: User, db: Session, notification_data: Dict[str, Any]
@@ -1057,11 +1091,14 @@ Based on this information, draft a helpful and appropriate reply.{' Remember to
                 new_history_id = history_results.get("historyId")
                 if new_history_id:
                     # Update the stored history ID - using runtime import to avoid circular imports
-                    from app.api.routes.auto_reply import get_auto_reply_config
+                    from app.api.routes.auto_reply import (
+                        get_auto_reply_config,
+                        save_auto_reply_config,
+                    )
 
                     config = get_auto_reply_config(user.id, db)
                     config.push_notification_history_id = new_history_id
-                    db.commit()
+                    save_auto_reply_config(user.id, config, db)
 
                 logger.info(
                     f"Processed {processed_count} emails, sent {replied_count} replies for user {user.id}"
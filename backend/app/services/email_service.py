@@ -3,6 +3,7 @@ import time
 import json
 import re
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 import html
 from typing import List, Dict, Any, Optional, Tuple
@@ -15,7 +16,7 @@ from app.db.database import get_db
 from app.models.user import User
 from app.models.email import EmailMetadata as Email
 from app.services.auth_service import get_google_creds
-from app.services.vector_db_service import vector_db
+from app.services.vector_db_service import get_vector_db
 from fastapi import Depends, HTTPException
 from fastapi import status
 from app.schemas.email import SendEmailRequest
@@ -31,7 +32,7 @@ import html
 
 from app.services.auth_service import get_current_user
 from app.services.embedding_service import process_thread_for_semantic_search
-from app.utils.thread_utils import get_thread_category
+from app.utils.thread_utils import get_thread_category, get_thread_categories
 
 # Import the email classifier - we'll use it in index_all_threads
 try:
@@ -318,6 +319,8 @@ def get_thread(
                     "subject": email_metadata.subject or "",
                     "snippet": email_metadata.snippet or "",
                     "body": final_body,  # Add the message body
+                    # Plain text bodies are wrapped in HTML above, so this is always HTML
+                    "mime_type": "text/html",
                     "full_content": email_metadata.full_content,  # Add the full content from DB if available
                     "date": (
                         email_metadata.date.isoformat() if email_metadata.date else None
@@ -384,6 +387,7 @@ def get_thread(
                         if body_content
                         else f"<div>{email_metadata.snippet or ''}</div>"
                     ),
+                    "mime_type": "text/html",
                     "full_content": email_metadata.full_content,  # Add the full content from DB
                     "date": (
                         email_metadata.date.isoformat() if email_metadata.date else None
@@ -450,7 +454,7 @@ def get_thread(
                 enhanced_thread = process_thread_for_semantic_search(thread_response)
 
                 # Store in vector database
-                vector_db.upsert_thread(user.id, enhanced_thread)
+                get_vector_db().upsert_thread(user.id, enhanced_thread)
 
                 print(f"Thread {thread_id} embedding stored in vector database")
             except Exception as e:
@@ -1055,7 +1059,7 @@ def search_similar_threads(
         query_embedding = create_thread_embedding(query)
 
         # Search vector database
-        results = vector_db.search_threads(
+        results = get_vector_db().search_threads(
             user.id, query_embedding, top_k, filter_category=filter_category
         )
 
@@ -1184,6 +1188,22 @@ def index_all_threads(
                 print(f"Error deleting existing emails: {str(delete_error)}")
                 db.rollback()
 
+        # Enhanced threads waiting to be upserted to the vector database. Full
+        # batches go to a single background worker so the upserts overlap with
+        # classifying and embedding the next threads.
+        vector_db = get_vector_db()
+        pending_upserts = []
+        upsert_executor = ThreadPoolExecutor(max_workers=1)
+        upsert_futures = []
+
+        # Threads that won't be classified take their category from existing
+        # labels, looked up for all of them in one query
+        existing_categories = {}
+        if not (is_new_user or email_classifier):
+            existing_categories = get_thread_categories(
+                [thread_item["id"] for thread_item in threads_to_process], user.id, db
+            )
+
         for thread_item in threads_to_process:
             thread_id = thread_item["id"]
             try:
@@ -1230,7 +1250,7 @@ def index_all_threads(
                             )
                 else:
                     # For existing users, try to get category from existing labels
-                    category = get_thread_category(thread_id, user.id, db)
+                    category = existing_categories.get(thread_id, "")
                     if category:
                         thread_data["category"] = category
                         print(
@@ -1240,13 +1260,15 @@ def index_all_threads(
                 # Process thread for semantic search
                 enhanced_thread = process_thread_for_semantic_search(thread_data)
 
-                # Store in vector database
-                success = vector_db.upsert_thread(user.id, enhanced_thread)
-
-                if success:
-                    print(f"Successfully indexed thread {thread_id} in Pinecone")
-                else:
-                    print(f"Failed to index thread {thread_id} in Pinecone")
+                # Queue for the vector database, upserting a full batch at a time
+                pending_upserts.append(enhanced_thread)
+                if len(pending_upserts) >= vector_db.upsert_batch_size:
+                    upsert_futures.append(
+                        upsert_executor.submit(
+                            vector_db.upsert_threads_bulk, user.id, pending_upserts
+                        )
+                    )
+                    pending_upserts = []
 
                 indexed_count += 1
 
@@ -1256,6 +1278,19 @@ def index_all_threads(
                 print(f"Error processing thread {thread_id}: {str(thread_error)}")
                 continue
 
+        # Upsert whatever is left over from the last partial batch
+        if pending_upserts:
+            upsert_futures.append(
+                upsert_executor.submit(
+                    vector_db.upsert_threads_bulk, user.id, pending_upserts
+                )
+            )
+
+        # Wait for the background upserts to finish
+        upserted_count = sum(future.result() for future in upsert_futures)
+        upsert_executor.shutdown()
+        print(f"Indexed {upserted_count} of {indexed_count} threads in Pinecone")
+
         return {
             "success": True,
             "message": f"Successfully indexed {indexed_count} threads with {classified_count} classified",
@@ -1528,7 +1563,7 @@ def index_thread(
         enhanced_thread = process_thread_for_semantic_search(thread_data)
 
         # Store in vector database
-        success = vector_db.upsert_thread(user.id, enhanced_thread)
+        success = get_vector_db().upsert_thread(user.id, enhanced_thread)
 
         if success:
             print(f"Successfully indexed thread {thread_id} in Pinecone")
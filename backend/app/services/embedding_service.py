@@ -12,6 +12,9 @@ EMBEDDING_MODEL = "text-embedding-3-large"
 EMBEDDING_ENCODING = "cl100k_base"
 EMBEDDING_DIMENSIONS = 3072  # Dimensions for text-embedding-3-large
 MAX_TOKENS = 8191  # Max tokens for the model
+EMBEDDING_BATCH_SIZE = 100  # Max texts sent per embeddings API request
+# Max tokens sent per embeddings API request (the API allows 300k per request)
+EMBEDDING_BATCH_MAX_TOKENS = 250_000
 
 
 def get_token_count(text: str) -> int:
@@ -130,6 +133,77 @@ class EmbeddingService:
             # Return a zero vector as fallback
             return [0.0] * self.dimensions
 
+    def generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embedding vectors for several texts, batching the API calls.
+        Identical texts are only sent to the API once, and each text is
+        truncated to the model's token limit.
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            Embedding vectors in the same order as the input texts, with None for
+            texts that could not be embedded
+        """
+        # Map each distinct text to its position in the list we actually embed
+        unique_index: Dict[str, int] = {}
+        for text in texts:
+            unique_index.setdefault(text, len(unique_index))
+
+        # Truncate each text to the token limit, keeping its token count so the
+        # batches can be capped by tokens as well as by count
+        encoding = tiktoken.get_encoding(self.encoding_name)
+        inputs = []
+        for text in unique_index:
+            tokens = encoding.encode(text)
+            if len(tokens) > self.max_tokens:
+                tokens = tokens[: self.max_tokens]
+                text = encoding.decode(tokens)
+            inputs.append((text, len(tokens)))
+
+        batches = []
+        batch, batch_tokens = [], 0
+        for text, token_count in inputs:
+            if batch and (
+                len(batch) >= EMBEDDING_BATCH_SIZE
+                or batch_tokens + token_count > EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += token_count
+        if batch:
+            batches.append(batch)
+
+        unique_embeddings = []
+        for batch in batches:
+            unique_embeddings.extend(self._embed_batch(batch))
+
+        return [unique_embeddings[unique_index[text]] for text in texts]
+
+    def _embed_batch(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed one batch of texts, retrying a failed batch as two halves so that
+        only the texts that fail on their own come back as None
+        """
+        try:
+            # The API accepts a list of inputs and returns one embedding per input
+            response = self.client.embeddings.create(input=batch, model=self.model_name)
+            data = sorted(response.data, key=lambda item: item.index)
+            return [item.embedding for item in data]
+
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error generating embedding: {str(e)}")
+                return [None]
+
+            print(
+                f"Error generating embeddings batch of {len(batch)}, retrying in halves: {str(e)}"
+            )
+            middle = len(batch) // 2
+            return self._embed_batch(batch[:middle]) + self._embed_batch(batch[middle:])
+
     def process_thread_for_semantic_search(
         self, thread: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -183,6 +257,16 @@ def create_thread_embedding(thread_text: str) -> List[float]:
     return _service.generate_embedding(thread_text)
 
 
+def create_thread_embedding_batch(
+    thread_texts: List[str],
+) -> List[Optional[List[float]]]:
+    """
+    Generate embedding vectors for several thread texts in batched API calls
+    (None for texts that could not be embedded).
+    """
+    return _service.generate_embeddings(thread_texts)
+
+
 def process_thread_for_semantic_search(thread: Dict[str, Any]) -> Dict[str, Any]:
     """
     Process a complete email thread for semantic search by:
@@ -15,8 +15,9 @@ from app.models.user import User
 from app.db.database import get_db
 from app.services.auth_service import get_current_user
 from app.services.embedding_service import create_thread_embedding
-from app.services.vector_db_service import vector_db
+from app.services.vector_db_service import get_vector_db
 from app.models.email import EmailMetadata as Email
+from app.utils.thread_utils import invalidate_thread_category
 from app.schemas.label import (
     LabelCategoryCreate,
     LabelCategoryUpdate,
@@ -332,6 +333,7 @@ class EmailLabelService:
             existing.is_confirmed = is_confirmed
             db.commit()
             db.refresh(existing)
+            invalidate_thread_category(thread_id, user_id)
             return existing
 
         # Create new thread label
@@ -345,6 +347,7 @@ class EmailLabelService:
         db.add(thread_label)
         db.commit()
         db.refresh(thread_label)
+        invalidate_thread_category(thread_id, user_id)
         return thread_label
 
     @staticmethod
@@ -367,6 +370,7 @@ class EmailLabelService:
 
         db.delete(thread_label)
         db.commit()
+        invalidate_thread_category(thread_id, user_id)
         return True
 
     @staticmethod
@@ -513,7 +517,7 @@ class EmailLabelService:
                 try:
                     # Get the thread's embedding from Pinecone
                     vector_id = f"user_{user_id}_{thread_label.thread_id}"
-                    vector_result = vector_db.index.fetch(
+                    vector_result = get_vector_db().index.fetch(
                         ids=[vector_id], namespace=f"email_threads_{user_id}"
                     )
 
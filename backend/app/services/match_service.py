@@ -1,18 +1,45 @@
 import os
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import Collection, List, Dict, Any, Optional
 import json
 from datetime import datetime
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 
 from app.models.user import User
 from app.models.match import JobCandidateMatch
-from app.services.vector_db_service import vector_db
-from app.services.embedding_service import create_thread_embedding
+from app.services.vector_db_service import get_vector_db
+from app.services.embedding_service import (
+    create_thread_embedding,
+    create_thread_embedding_batch,
+)
 from app.services.auth_service import get_current_user
 from app.db.database import get_db
 from app.services.email_service import get_thread
 
+# Max characters of thread text sent to the embedding model (~4000 tokens)
+MAX_MATCH_TEXT_CHARS = 16000
+
+
+def _build_match_text(thread: Dict[str, Any]) -> str:
+    """
+    Join a thread's message bodies into the text used for matching.
+
+    Long threads are capped at MAX_MATCH_TEXT_CHARS, keeping the first message
+    (the job description or candidate intro) and the most recent messages.
+    """
+    bodies = [
+        message.get("body", message.get("snippet", ""))
+        for message in thread.get("messages", [])
+    ]
+    text = "".join(f"{body}\n\n" for body in bodies)
+    if len(text) <= MAX_MATCH_TEXT_CHARS:
+        return text
+
+    first = f"{bodies[0][: MAX_MATCH_TEXT_CHARS // 4]}\n\n"
+    return first + text[len(first) - MAX_MATCH_TEXT_CHARS :]
+
 
 class MatchService:
     """Service for matching job postings with candidates and vice versa"""
@@ -47,10 +74,7 @@ class MatchService:
                 )
 
             # Extract job details to use for matching
-            job_text = ""
-            for message in job_thread.get("messages", []):
-                message_content = message.get("body", message.get("snippet", ""))
-                job_text += f"{message_content}\n\n"
+            job_text = _build_match_text(job_thread)
 
             # Generate embedding for the job posting
             job_embedding = create_thread_embedding(job_text)
@@ -93,45 +117,27 @@ class MatchService:
                 }
 
             # Search for similar threads in vector database
-            results = vector_db.search_threads(
-                user.id, job_embedding, min(top_k * 3, len(candidate_thread_ids))
+            results = get_vector_db().search_threads(
+                user.id,
+                job_embedding,
+                min(top_k * 3, len(candidate_thread_ids)),
+                include_metadata=False,
             )
 
-            # Filter results to only include candidate threads
-            matching_candidates = []
-            for result in results:
-                if result["thread_id"] in candidate_thread_ids:
-                    # Get detailed data for this candidate
-                    candidate_thread = get_thread(
-                        thread_id=result["thread_id"], user=user, db=db
-                    )
-
-                    # Store match in database
-                    match_record = JobCandidateMatch(
-                        user_id=user.id,
-                        job_thread_id=job_thread_id,
-                        candidate_thread_id=result["thread_id"],
-                        similarity_score=result["score"],
-                        matched_at=datetime.utcnow(),
-                        match_type="job_to_candidate",
-                    )
-                    db.add(match_record)
-
-                    # Add to results
-                    matching_candidates.append(
-                        {
-                            "thread_id": result["thread_id"],
-                            "subject": result["subject"],
-                            "participants": result["participants"],
-                            "message_count": result["message_count"],
-                            "last_updated": result["last_updated"],
-                            "similarity_score": result["score"],
-                            "candidate_thread": candidate_thread,
-                        }
-                    )
+            # Threads already fetched for this request, so each one is only
+            # materialised once (the job thread can show up in its own results)
+            thread_cache: Dict[str, Dict[str, Any]] = {job_thread_id: job_thread}
 
-                    if len(matching_candidates) >= top_k:
-                        break
+            # Filter results to only include candidate threads
+            matching_candidates = MatchService._collect_candidate_matches(
+                job_thread_id,
+                results,
+                candidate_thread_ids,
+                thread_cache,
+                user,
+                db,
+                top_k,
+            )
 
             # Commit changes to database
             db.commit()
@@ -151,6 +157,187 @@ class MatchService:
                 detail=f"Error finding matching candidates: {str(e)}",
             )
 
+    @staticmethod
+    def _collect_candidate_matches(
+        job_thread_id: str,
+        results: List[Dict[str, Any]],
+        candidate_thread_ids: Collection[str],
+        thread_cache: Dict[str, Dict[str, Any]],
+        user: User,
+        db: Session,
+        top_k: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Turn vector search results for a job into candidate matches
+
+        Only results that are candidate threads are kept. Each match is added to
+        the session (the caller commits) and candidate threads are looked up in
+        thread_cache before being fetched. results only need thread_id and
+        score; metadata is fetched for the matches that are kept.
+        """
+        results = [
+            result for result in results if result["thread_id"] in candidate_thread_ids
+        ][:top_k]
+        results = get_vector_db().add_thread_metadata(user.id, results)
+
+        matching_candidates = []
+        for result in results:
+            # Get detailed data for this candidate
+            candidate_thread = thread_cache.get(result["thread_id"])
+            if candidate_thread is None:
+                candidate_thread = get_thread(
+                    thread_id=result["thread_id"], user=user, db=db
+                )
+                thread_cache[result["thread_id"]] = candidate_thread
+
+            # Store match in database
+            match_record = JobCandidateMatch(
+                user_id=user.id,
+                job_thread_id=job_thread_id,
+                candidate_thread_id=result["thread_id"],
+                similarity_score=result["score"],
+                matched_at=datetime.utcnow(),
+                match_type="job_to_candidate",
+            )
+            db.add(match_record)
+
+            # Add to results
+            matching_candidates.append(
+                {
+                    "thread_id": result["thread_id"],
+                    "subject": result["subject"],
+                    "participants": result["participants"],
+                    "message_count": result["message_count"],
+                    "last_updated": result["last_updated"],
+                    "similarity_score": result["score"],
+                    "candidate_thread": candidate_thread,
+                }
+            )
+
+        return matching_candidates
+
+    @staticmethod
+    async def find_matching_candidates_bulk(
+        job_thread_ids: List[str],
+        user: User,
+        db: Session,
+        top_k: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Find candidates that match several job postings at once
+
+        The job texts are embedded in batched API calls and the vector searches
+        run concurrently, instead of one embedding call and search per job.
+
+        Args:
+            job_thread_ids: The thread IDs of the job posting emails
+            user: The current user
+            db: Database session
+            top_k: Number of candidates to return per job
+
+        Returns:
+            Dictionary with match results keyed by job thread ID
+        """
+        try:
+            # Get the job posting threads (each one once)
+            job_thread_ids = list(dict.fromkeys(job_thread_ids))
+            thread_cache: Dict[str, Dict[str, Any]] = {}
+            for job_thread_id in job_thread_ids:
+                job_thread = get_thread(thread_id=job_thread_id, user=user, db=db)
+                if not job_thread:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Job thread {job_thread_id} not found",
+                    )
+                thread_cache[job_thread_id] = job_thread
+
+            # Find threads with the "Candidate" label
+            from app.models.email_label import ThreadLabel, EmailLabel
+
+            candidate_thread_ids = {
+                thread_label.thread_id
+                for thread_label in db.query(ThreadLabel)
+                .join(EmailLabel, ThreadLabel.label_id == EmailLabel.id)
+                .filter(
+                    ThreadLabel.user_id == user.id,
+                    EmailLabel.name == "Candidate",
+                )
+                .all()
+            }
+
+            matches = {
+                job_thread_id: {
+                    "job_thread_id": job_thread_id,
+                    "job_title": thread_cache[job_thread_id].get(
+                        "subject", "No Subject"
+                    ),
+                    "candidates": [],
+                    "count": 0,
+                }
+                for job_thread_id in job_thread_ids
+            }
+
+            if not candidate_thread_ids:
+                return {"matches": matches, "count": len(matches)}
+
+            # Generate embeddings for all job postings in batched calls
+            job_embeddings = create_thread_embedding_batch(
+                [
+                    _build_match_text(thread_cache[job_thread_id])
+                    for job_thread_id in job_thread_ids
+                ]
+            )
+
+            # Jobs whose embedding failed are left without candidates
+            embedded_jobs = [
+                (job_thread_id, job_embedding)
+                for job_thread_id, job_embedding in zip(job_thread_ids, job_embeddings)
+                if job_embedding is not None
+            ]
+
+            # Search the vector database for all jobs concurrently
+            search_k = min(top_k * 3, len(candidate_thread_ids))
+            all_results = await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        get_vector_db().search_threads,
+                        user.id,
+                        job_embedding,
+                        search_k,
+                        include_metadata=False,
+                    )
+                    for _, job_embedding in embedded_jobs
+                )
+            )
+
+            for (job_thread_id, _), results in zip(embedded_jobs, all_results):
+                candidates = MatchService._collect_candidate_matches(
+                    job_thread_id,
+                    results,
+                    candidate_thread_ids,
+                    thread_cache,
+                    user,
+                    db,
+                    top_k,
+                )
+                matches[job_thread_id]["candidates"] = candidates
+                matches[job_thread_id]["count"] = len(candidates)
+
+            # Commit changes to database
+            db.commit()
+
+            return {"matches": matches, "count": len(matches)}
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            db.rollback()
+            print(f"Error finding matching candidates in bulk: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error finding matching candidates in bulk: {str(e)}",
+            )
+
     @staticmethod
     async def find_matching_jobs(
         candidate_thread_id: str,
@@ -183,10 +370,7 @@ class MatchService:
                 )
 
             # Extract candidate details to use for matching
-            candidate_text = ""
-            for message in candidate_thread.get("messages", []):
-                message_content = message.get("body", message.get("snippet", ""))
-                candidate_text += f"{message_content}\n\n"
+            candidate_text = _build_match_text(candidate_thread)
 
             # Generate embedding for the candidate
             candidate_embedding = create_thread_embedding(candidate_text)
@@ -226,18 +410,38 @@ class MatchService:
                 }
 
             # Search for similar threads in vector database
-            results = vector_db.search_threads(
-                user.id, candidate_embedding, min(top_k * 3, len(job_thread_ids))
+            results = get_vector_db().search_threads(
+                user.id,
+                candidate_embedding,
+                min(top_k * 3, len(job_thread_ids)),
+                include_metadata=False,
+            )
+
+            # Threads already fetched for this request, so each one is only
+            # materialised once (the candidate thread can show up in its own results)
+            thread_cache: Dict[str, Dict[str, Any]] = {
+                candidate_thread_id: candidate_thread
+            }
+
+            # Filter results to only include job posting threads, fetching
+            # metadata just for the ones that are kept
+            results = get_vector_db().add_thread_metadata(
+                user.id,
+                [result for result in results if result["thread_id"] in job_thread_ids][
+                    :top_k
+                ],
             )
 
-            # Filter results to only include job posting threads
             matching_jobs = []
             for result in results:
                 if result["thread_id"] in job_thread_ids:
                     # Get detailed data for this job
-                    job_thread = get_thread(
-                        thread_id=result["thread_id"], user=user, db=db
-                    )
+                    job_thread = thread_cache.get(result["thread_id"])
+                    if job_thread is None:
+                        job_thread = get_thread(
+                            thread_id=result["thread_id"], user=user, db=db
+                        )
+                        thread_cache[result["thread_id"]] = job_thread
 
                     # Store match in database
                     match_record = JobCandidateMatch(
@@ -286,7 +490,13 @@ class MatchService:
 
     @staticmethod
     async def get_previous_matches(
-        thread_id: str, match_type: str, user: User, db: Session, limit: int = 10
+        thread_id: str,
+        match_type: str,
+        user: User,
+        db: Session,
+        limit: int = 10,
+        before_matched_at: Optional[datetime] = None,
+        before_id: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Get previous matches for a thread
@@ -297,6 +507,10 @@ class MatchService:
             user: The current user
             db: Database session
             limit: Maximum number of matches to return
+            before_matched_at: Only return matches older than this timestamp
+                (pass the last `matched_at` of the previous page to paginate)
+            before_id: The last `match_id` of the previous page, so matches made
+                at the same timestamp as the page boundary aren't skipped
 
         Returns:
             List of previous matches
@@ -312,9 +526,23 @@ class MatchService:
             else:
                 query = query.filter(JobCandidateMatch.candidate_thread_id == thread_id)
 
+            # Keyset pagination: continue from the previous page's last match. Bulk
+            # matching stamps many matches with the same time, so the id breaks ties
+            if before_matched_at and before_id is not None:
+                query = query.filter(
+                    tuple_(JobCandidateMatch.matched_at, JobCandidateMatch.id)
+                    < tuple_(before_matched_at, before_id)
+                )
+            elif before_matched_at:
+                query = query.filter(JobCandidateMatch.matched_at < before_matched_at)
+
             # Get the most recent matches
             matches = (
-                query.order_by(JobCandidateMatch.matched_at.desc()).limit(limit).all()
+                query.order_by(
+                    JobCandidateMatch.matched_at.desc(), JobCandidateMatch.id.desc()
+                )
+                .limit(limit)
+                .all()
             )
 
             # Format the results
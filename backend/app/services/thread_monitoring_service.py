@@ -8,7 +8,7 @@ from app.models.user import User
 from app.services.email_service import get_thread, get_gmail_service
 from app.services.auth_service import get_google_creds
 from app.services.embedding_service import create_thread_embedding
-from app.services.vector_db_service import vector_db
+from app.services.vector_db_service import get_vector_db
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -71,7 +71,9 @@ class ThreadMonitoringService:
                     )
 
                     # Query the vector DB to see if we have an older version
-                    thread_in_vector = vector_db.get_thread_by_id(user.id, thread_id)
+                    thread_in_vector = get_vector_db().get_thread_by_id(
+                        user.id, thread_id
+                    )
 
                     # If thread exists and has a different message count, it needs updating
                     if thread_in_vector and len(
@@ -151,7 +153,7 @@ class ThreadMonitoringService:
             # Check if this thread exists in our vector database
             has_prior_response = False
             try:
-                thread_in_vector = vector_db.get_thread_by_id(user.id, thread_id)
+                thread_in_vector = get_vector_db().get_thread_by_id(user.id, thread_id)
                 has_prior_response = thread_in_vector is not None
             except Exception as e:
                 logger.warning(
@@ -176,8 +178,37 @@ class ThreadMonitoringService:
                     )
                     logger.info(f"Thread {thread_id} added to explicit monitoring list")
 
-                # Get the full, latest thread data and store its embedding
+                # Get the latest thread data and only re-embed it if it has grown
                 try:
+                    current_thread = get_thread(
+                        thread_id=thread_id,
+                        user=user,
+                        db=db,
+                        store_embedding=False,  # Don't store yet, we'll do it only if needed
+                    )
+
+                    # Notifications also fire for label changes etc., so skip the
+                    # embedding when the thread has no new content
+                    has_new_content = len(
+                        current_thread["messages"]
+                    ) > thread_in_vector.get("message_count", 0) or current_thread.get(
+                        "last_updated", ""
+                    ) > thread_in_vector.get(
+                        "last_updated", ""
+                    )
+                    if not has_new_content:
+                        logger.info(
+                            f"Thread {thread_id} unchanged since last upsert, skipping vector DB update"
+                        )
+                        return {
+                            "success": True,
+                            "message": f"Thread {thread_id} unchanged, vector database not updated",
+                            "thread_id": thread_id,
+                            "is_monitored": True,
+                            "explicitly_monitored": explicitly_monitored,
+                            "had_prior_response": True,
+                        }
+
                     updated_thread = get_thread(
                         thread_id=thread_id,
                         user=user,
@@ -1,19 +1,125 @@
 import os
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import NotFoundException
 import time
-import json
+import orjson
+import random
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from cachetools import TTLCache
 from app.services.embedding_service import EMBEDDING_DIMENSIONS
 import logging
 
 # Constants
 INDEX_NAME = "supperconnector"
 PINECONE_NAMESPACE = "email_threads"
+UPSERT_BATCH_SIZE = int(
+    os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100")
+)  # Vectors sent per upsert request
+UPSERT_CONCURRENCY = 4  # Upsert requests in flight at once
+# Pinecone rejects upsert requests over 2 MB, and a 3072-d vector with its
+# full_content metadata is close to 100 KB, so batches are also capped by size
+UPSERT_MAX_REQUEST_BYTES = int(
+    os.getenv("PINECONE_UPSERT_MAX_REQUEST_BYTES", str(1_800_000))
+)
+INDEX_READY_MAX_DELAY = 30  # Max seconds between index readiness checks
+# Keep-alive HTTP connections shared by every thread using the index handle
+CONNECTION_POOL_SIZE = int(os.getenv("PINECONE_CONNECTION_POOL_SIZE", "32"))
+
+# Batch size calibration (enabled with PINECONE_AUTOTUNE=1). The dummy vectors
+# carry full-size metadata, so every candidate batch stays under the request cap
+AUTOTUNE_BATCH_SIZES = (4, 8, 16)
+AUTOTUNE_SAMPLE_SIZE = 128
+AUTOTUNE_NAMESPACE = f"{PINECONE_NAMESPACE}_autotune"
+AUTOTUNE_RESULT_FILE = os.getenv(
+    "PINECONE_AUTOTUNE_FILE",
+    os.path.join(tempfile.gettempdir(), "pinecone_upsert_batch_size.json"),
+)
+AUTOTUNE_RESULT_TTL_SECONDS = 7 * 24 * 3600  # Recalibrate at least weekly
+
+FULL_CONTENT_MAX_CHARS = 35000  # Pinecone caps metadata at 40 KB per vector
+TEXT_PREVIEW_CHARS = 1000
+
+# In-process caches for fetched threads and search results
+CACHE_TTL_SECONDS = 300
+THREAD_CACHE_SIZE = 10_000
+SEARCH_CACHE_SIZE = 1_000
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+def _participants(metadata: Dict[str, Any]) -> List[str]:
+    """Participants of a thread as stored in its metadata"""
+    participants = metadata.get("participants", [])
+    # Older vectors store participants as a JSON string
+    if isinstance(participants, str):
+        return orjson.loads(participants)
+    return list(participants)
+
+
+def _text_preview(metadata: Dict[str, Any]) -> str:
+    """Preview of a thread's content for display in search results"""
+    # Older vectors still carry a stored preview
+    return (
+        metadata.get("text_preview")
+        or metadata.get("full_content", "")[:TEXT_PREVIEW_CHARS]
+    )
+
+
+def _vector_size(vector: tuple) -> int:
+    """Approximate size of a vector in the JSON body of an upsert request"""
+    vector_id, values, metadata = vector
+    return len(orjson.dumps({"id": vector_id, "values": values, "metadata": metadata}))
+
+
+def _split_batches(vectors: List[tuple], batch_size: int) -> List[List[tuple]]:
+    """Split vectors into batches of at most batch_size vectors and
+    UPSERT_MAX_REQUEST_BYTES bytes (a larger vector still gets its own batch)"""
+    batches = []
+    batch, batch_bytes = [], 0
+    for vector in vectors:
+        size = _vector_size(vector)
+        if batch and (
+            len(batch) >= batch_size or batch_bytes + size > UPSERT_MAX_REQUEST_BYTES
+        ):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(vector)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+@lru_cache(maxsize=4096)
+def _ns(user_id: int) -> str:
+    """Pinecone namespace holding a user's threads (one per user for isolation)"""
+    return f"{PINECONE_NAMESPACE}_{user_id}"
+
+
+def _build_metadata(user_id: int, thread_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata stored with a thread's vector (everything except the embedding)"""
+    return {
+        "user_id": user_id,
+        "thread_id": thread_data["thread_id"],
+        "subject": thread_data["subject"],
+        # Pinecone stores lists of strings natively (and can filter on them)
+        "participants": [str(p) for p in thread_data["participants"]],
+        "message_count": thread_data["message_count"],
+        "last_updated": thread_data["last_updated"],
+        # Store the full text content (the preview is derived from it on read),
+        # clamped to stay under Pinecone's metadata size limit
+        "full_content": thread_data["text_content"][:FULL_CONTENT_MAX_CHARS],
+        # Store the category if available
+        "category": thread_data.get("category", ""),
+    }
+
+
 class VectorDBService:
     """Service to handle interactions with Pinecone vector database"""
 
@@ -27,18 +133,46 @@ class VectorDBService:
         region = os.getenv("PINECONE_REGION", "us-west-2")
         self.spec = ServerlessSpec(cloud=cloud, region=region)
 
+        # Caches keyed by (user_id, thread_id) and by search parameters; the lock
+        # guards them because upserts and searches also run on worker threads
+        self._thread_cache = TTLCache(maxsize=THREAD_CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+        self._search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+        self._cache_lock = threading.Lock()
+
         # Initialize index
         self._init_index()
 
-        # Connect to index
-        self.index = self.pc.Index(INDEX_NAME)
+        # Connect to index, with a thread pool for parallel async requests. This
+        # single handle (and its connection pool) is shared by all callers, so
+        # size the pool to avoid discarding connections and re-doing TLS handshakes
+        self.index = self.pc.Index(
+            INDEX_NAME,
+            pool_threads=UPSERT_CONCURRENCY,
+            connection_pool_maxsize=CONNECTION_POOL_SIZE,
+        )
+
+        # Pick the upsert batch size, calibrating it against the index if requested
+        # (an explicit PINECONE_UPSERT_BATCH_SIZE always wins)
+        self.upsert_batch_size = UPSERT_BATCH_SIZE
+        if (
+            os.getenv("PINECONE_AUTOTUNE") == "1"
+            and "PINECONE_UPSERT_BATCH_SIZE" not in os.environ
+        ):
+            self.upsert_batch_size = self._autotune_batch_size()
 
     def _init_index(self) -> None:
         """Initialize the Pinecone index if it doesn't exist"""
         try:
-            # Check if index already exists
-            if INDEX_NAME not in self.pc.list_indexes().names():
-                print(f"Creating index '{INDEX_NAME}'...")
+            # Check if index already exists (one describe call instead of listing
+            # every index in the project)
+            try:
+                self.pc.describe_index(INDEX_NAME)
+                index_exists = True
+            except NotFoundException:
+                index_exists = False
+
+            if not index_exists:
+                logger.info("Creating index '%s'...", INDEX_NAME)
                 # Create index with appropriate dimensions for text-embedding-3-small
                 self.pc.create_index(
                     name=INDEX_NAME,
@@ -47,16 +181,150 @@ class VectorDBService:
                     spec=self.spec,
                 )
 
-                # Wait for index to be ready
+                # Wait for index to be ready, backing off between status checks
+                delay = 1
                 while not self.pc.describe_index(INDEX_NAME).status["ready"]:
-                    time.sleep(1)
+                    time.sleep(delay)
+                    delay = min(delay * 2, INDEX_READY_MAX_DELAY)
 
-                print(f"Index '{INDEX_NAME}' created successfully")
+                logger.info("Index '%s' created successfully", INDEX_NAME)
             else:
-                print(f"Index '{INDEX_NAME}' already exists")
+                logger.info("Index '%s' already exists", INDEX_NAME)
 
         except Exception as e:
-            print(f"Error initializing Pinecone index: {str(e)}")
+            logger.error("Error initializing Pinecone index: %s", e, exc_info=True)
+
+    def _autotune_batch_size(self) -> int:
+        """
+        Time upserts of dummy vectors at a few batch sizes and return the fastest.
+        The result is saved to AUTOTUNE_RESULT_FILE and reused on later starts,
+        until it expires or the calibration settings change.
+        """
+        try:
+            settings = {
+                "batch_sizes": list(AUTOTUNE_BATCH_SIZES),
+                "dimensions": EMBEDDING_DIMENSIONS,
+                "max_request_bytes": UPSERT_MAX_REQUEST_BYTES,
+            }
+            try:
+                with open(AUTOTUNE_RESULT_FILE, "rb") as f:
+                    saved = orjson.loads(f.read())
+                if (
+                    saved["settings"] == settings
+                    and time.time() - saved["saved_at"] < AUTOTUNE_RESULT_TTL_SECONDS
+                ):
+                    return int(saved["batch_size"])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # No usable saved result, calibrate again
+
+            metadata = {"full_content": "x" * FULL_CONTENT_MAX_CHARS}
+            vectors = [
+                (
+                    f"autotune_{i}",
+                    [random.random() for _ in range(EMBEDDING_DIMENSIONS)],
+                    metadata,
+                )
+                for i in range(AUTOTUNE_SAMPLE_SIZE)
+            ]
+
+            timings = {}
+            try:
+                for batch_size in AUTOTUNE_BATCH_SIZES:
+                    start = time.perf_counter()
+                    upserted = self._upsert_vectors(
+                        vectors, AUTOTUNE_NAMESPACE, batch_size
+                    )
+                    if upserted != len(vectors):
+                        raise RuntimeError(
+                            f"only {upserted} of {len(vectors)} dummy vectors "
+                            f"upserted at batch size {batch_size}"
+                        )
+                    timings[batch_size] = time.perf_counter() - start
+            finally:
+                # Remove the dummy vectors again, even if calibration failed
+                try:
+                    self.index.delete(delete_all=True, namespace=AUTOTUNE_NAMESPACE)
+                except Exception as e:
+                    logger.warning("Error removing calibration vectors: %s", e)
+
+            best_batch_size = min(timings, key=timings.get)
+            with open(AUTOTUNE_RESULT_FILE, "wb") as f:
+                f.write(
+                    orjson.dumps(
+                        {
+                            "batch_size": best_batch_size,
+                            "settings": settings,
+                            "saved_at": time.time(),
+                        }
+                    )
+                )
+
+            logger.info(
+                "Pinecone upsert batch size calibrated to %s (timings: %s)",
+                best_batch_size,
+                timings,
+            )
+            return best_batch_size
+
+        except Exception as e:
+            logger.warning(
+                "Error calibrating Pinecone upsert batch size: %s", e, exc_info=True
+            )
+            return UPSERT_BATCH_SIZE
+
+    def _upsert_vectors(
+        self, vectors: List[tuple], namespace: str, batch_size: int
+    ) -> int:
+        """
+        Upsert vectors in size-capped batches, with the requests sent in parallel.
+        Returns the number of vectors stored; failed batches are split and retried.
+        """
+        batches = _split_batches(vectors, batch_size)
+        async_results = [
+            self.index.upsert(vectors=batch, namespace=namespace, async_req=True)
+            for batch in batches
+        ]
+
+        # Wait for every batch to finish, retrying the ones that failed
+        upserted = 0
+        for batch, async_result in zip(batches, async_results):
+            try:
+                async_result.get()
+                upserted += len(batch)
+            except Exception as e:
+                upserted += self._retry_upsert(batch, namespace, e)
+        return upserted
+
+    def _retry_upsert(
+        self, batch: List[tuple], namespace: str, error: Exception
+    ) -> int:
+        """Retry a failed batch as two halves, only dropping single vectors"""
+        if len(batch) == 1:
+            logger.error(
+                "Error upserting vector %s to Pinecone: %s", batch[0][0], error
+            )
+            return 0
+
+        logger.warning(
+            "Upsert of %s vectors failed, retrying in halves: %s", len(batch), error
+        )
+        middle = len(batch) // 2
+        upserted = 0
+        for half in (batch[:middle], batch[middle:]):
+            try:
+                self.index.upsert(vectors=half, namespace=namespace)
+                upserted += len(half)
+            except Exception as e:
+                upserted += self._retry_upsert(half, namespace, e)
+        return upserted
+
+    def _invalidate_cache(self, user_id: int, thread_ids: List[str]) -> None:
+        """Drop cached fetches for these threads and all of the user's searches"""
+        with self._cache_lock:
+            for thread_id in thread_ids:
+                self._thread_cache.pop((user_id, thread_id), None)
+            for key in [key for key in self._search_cache if key[0] == user_id]:
+                self._search_cache.pop(key, None)
 
     def upsert_thread(self, user_id: int, thread_data: Dict[str, Any]) -> bool:
         """
@@ -69,62 +337,74 @@ class VectorDBService:
         Returns:
             bool: Success status
         """
+        return self.upsert_threads_bulk(user_id, [thread_data]) == 1
+
+    def upsert_threads_bulk(self, user_id: int, threads: List[Dict[str, Any]]) -> int:
+        """
+        Upsert several email threads to Pinecone, batching the requests
+
+        Args:
+            user_id: The ID of the user who owns the threads
+            threads: The thread data with embeddings
+
+        Returns:
+            int: Number of threads upserted
+        """
         try:
-            # Create a unique ID that combines user_id and thread_id
-            vector_id = f"user_{user_id}_{thread_data['thread_id']}"
-
-            # Extract the embedding
-            embedding = thread_data.get("embedding")
-            if not embedding:
-                print(f"No embedding found for thread {thread_data['thread_id']}")
-                return False
-
-            # Prepare metadata (exclude the embedding to save space)
-            metadata = {
-                "user_id": user_id,
-                "thread_id": thread_data["thread_id"],
-                "subject": thread_data["subject"],
-                "participants": json.dumps(thread_data["participants"]),
-                "message_count": thread_data["message_count"],
-                "last_updated": thread_data["last_updated"],
-                # Store the full text content instead of just a preview
-                "full_content": thread_data["text_content"],
-                # Keep a preview for quick display in search results
-                "text_preview": (
-                    thread_data["text_content"][:1000]
-                    if "text_content" in thread_data
-                    else ""
-                ),
-                # Store the category if available
-                "category": thread_data.get("category", ""),
-            }
+            vectors = []
+            for thread_data in threads:
+                # Create a unique ID that combines user_id and thread_id
+                vector_id = f"user_{user_id}_{thread_data['thread_id']}"
+
+                # Extract the embedding
+                embedding = thread_data.get("embedding")
+                if not embedding:
+                    logger.debug(
+                        "No embedding found for thread %s", thread_data["thread_id"]
+                    )
+                    continue
+
+                vectors.append(
+                    (vector_id, embedding, _build_metadata(user_id, thread_data))
+                )
 
-            # Upsert to Pinecone
-            self.index.upsert(
-                vectors=[(vector_id, embedding, metadata)],
-                namespace=f"{PINECONE_NAMESPACE}_{user_id}",  # Namespace per user for isolation
+            if not vectors:
+                return 0
+
+            # Upsert to Pinecone in batches, with the requests sent in parallel
+            upserted = self._upsert_vectors(
+                vectors,
+                _ns(user_id),
+                self.upsert_batch_size,
+            )
+            self._invalidate_cache(
+                user_id, [metadata["thread_id"] for _, _, metadata in vectors]
             )
 
-            print(
-                f"Thread {thread_data['thread_id']} with full content upserted to Pinecone for user {user_id}"
+            logger.debug(
+                "%s of %s threads with full content upserted to Pinecone for user %s",
+                upserted,
+                len(vectors),
+                user_id,
             )
-            return True
+            return upserted
 
         except Exception as e:
-            print(f"Error upserting thread to Pinecone: {str(e)}")
-            return False
+            logger.error("Error upserting threads to Pinecone: %s", e, exc_info=True)
+            return 0
 
     def delete_thread(self, user_id: int, thread_id: str) -> bool:
         """Delete a thread from Pinecone"""
         try:
             vector_id = f"user_{user_id}_{thread_id}"
-            self.index.delete(
-                ids=[vector_id], namespace=f"{PINECONE_NAMESPACE}_{user_id}"
+            self.index.delete(ids=[vector_id], namespace=_ns(user_id))
+            self._invalidate_cache(user_id, [thread_id])
+            logger.debug(
+                "Thread %s deleted from Pinecone for user %s", thread_id, user_id
             )
-            print(f"Thread {thread_id} deleted from Pinecone for user {user_id}")
             return True
         except Exception as e:
-            print(f"Error deleting thread from Pinecone: {str(e)}")
+            logger.error("Error deleting thread from Pinecone: %s", e, exc_info=True)
             return False
 
     def search_threads(
@@ -133,6 +413,7 @@ class VectorDBService:
         query_embedding: List[float],
         top_k: int = 10,
         filter_category: Optional[str] = None,
+        include_metadata: bool = True,
     ) -> List[Dict[str, Any]]:
         """
         Search for similar email threads using vector similarity
@@ -142,44 +423,63 @@ class VectorDBService:
             query_embedding: The embedding vector of the search query
             top_k: Number of results to return
             filter_category: Optionally filter results to a specific category (e.g., "Job Posting" or "Candidate")
+            include_metadata: Whether to return thread metadata. Pinecone can't
+                return a subset of the metadata, so callers that discard most
+                results should pass False (getting only thread_id and score) and
+                call add_thread_metadata on the results they keep, rather than
+                downloading full_content for every match
 
         Returns:
             List of thread metadata ordered by relevance
         """
-        try:
-            # Prepare filter conditions
-            filter_condition = {}
-
-            # Always filter by user_id
-            filter_condition["user_id"] = user_id
+        # Serve repeated searches for the same embedding from the cache
+        embedding_key = hashlib.blake2b(
+            np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16
+        ).digest()
+        cache_key = (user_id, embedding_key, top_k, filter_category, include_metadata)
+        with self._cache_lock:
+            cached_results = self._search_cache.get(cache_key)
+        if cached_results is not None:
+            return [dict(result) for result in cached_results]
 
-            # Optionally filter by category
+        try:
+            # Optionally filter by category (the per-user namespace already
+            # isolates each user's threads, so there is no need to filter on
+            # user_id, and no filter is built when there is nothing to filter)
+            filter_condition = None
             if filter_category:
-                filter_condition["category"] = filter_category
-                print(f"Filtering by category: {filter_category}")
+                filter_condition = {"category": filter_category}
+                logger.debug("Filtering by category: %s", filter_category)
 
             # Execute the query with error handling
             try:
                 results = self.index.query(
                     vector=query_embedding,
-                    top_k=top_k * 3,  # Fetch more items to account for filtering
-                    namespace=f"{PINECONE_NAMESPACE}_{user_id}",
-                    include_metadata=True,
+                    top_k=top_k,  # Filtering happens in the index, no need to over-fetch
+                    namespace=_ns(user_id),
+                    include_metadata=include_metadata,
                     filter=filter_condition,
                 )
             except Exception as query_error:
-                print(f"Vector query error: {str(query_error)}")
+                logger.error("Vector query error: %s", query_error, exc_info=True)
                 # Return empty results instead of failing completely
                 return []
 
             # Format the results
             formatted_results = []
             for match in results["matches"]:
-                try:
-                    # Convert participants back from JSON string
-                    participants = json.loads(
-                        match["metadata"].get("participants", "[]")
+                if not include_metadata:
+                    # Vector IDs are "user_{user_id}_{thread_id}"
+                    formatted_results.append(
+                        {
+                            "thread_id": match["id"].removeprefix(f"user_{user_id}_"),
+                            "score": match["score"],
+                        }
                     )
+                    continue
+
+                try:
+                    participants = _participants(match["metadata"])
 
                     formatted_results.append(
                         {
@@ -188,7 +488,7 @@ class VectorDBService:
                             "participants": participants,
                             "message_count": int(match["metadata"]["message_count"]),
                             "last_updated": match["metadata"]["last_updated"],
-                            "text_preview": match["metadata"].get("text_preview", ""),
+                            "text_preview": _text_preview(match["metadata"]),
                             "full_content": match["metadata"].get(
                                 "full_content", ""
                             ),  # Include full content in results
@@ -198,20 +498,18 @@ class VectorDBService:
                             "score": match["score"],  # Similarity score
                         }
                     )
-
-                    # Limit to requested number of results after filtering
-                    if len(formatted_results) >= top_k:
-                        break
                 except Exception as format_error:
                     # Skip malformed results rather than failing completely
-                    print(f"Error formatting search result: {str(format_error)}")
+                    logger.warning("Error formatting search result: %s", format_error)
                     continue
 
-            print(f"Found {len(formatted_results)} results matching the query")
-            return formatted_results
+            logger.debug("Found %s results matching the query", len(formatted_results))
+            with self._cache_lock:
+                self._search_cache[cache_key] = formatted_results
+            return [dict(result) for result in formatted_results]
 
         except Exception as e:
-            print(f"Error searching threads: {str(e)}")
+            logger.error("Error searching threads: %s", e, exc_info=True)
             return []  # Return empty list instead of failing
 
     def get_stats(self) -> Dict[str, Any]:
@@ -219,7 +517,7 @@ class VectorDBService:
         try:
             return self.index.describe_index_stats()
         except Exception as e:
-            print(f"Error getting index stats: {str(e)}")
+            logger.error("Error getting index stats: %s", e, exc_info=True)
             return {}
 
     def get_thread_by_id(
@@ -235,32 +533,69 @@ class VectorDBService:
         Returns:
             Thread metadata if found, None otherwise
         """
+        return self.get_threads_by_ids(user_id, [thread_id]).get(thread_id)
+
+    def get_threads_by_ids(
+        self, user_id: int, thread_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve several threads by ID from the vector database in one fetch
+
+        Args:
+            user_id: The ID of the user who owns the threads
+            thread_ids: The IDs of the threads to retrieve
+
+        Returns:
+            Thread metadata keyed by thread ID, for the threads that were found
+        """
+        threads = {}
+
+        # Serve repeated fetches of the same thread from the cache
+        with self._cache_lock:
+            for thread_id in thread_ids:
+                cached_thread = self._thread_cache.get((user_id, thread_id))
+                if cached_thread is not None:
+                    threads[thread_id] = dict(cached_thread)
+        missing_ids = [
+            thread_id for thread_id in thread_ids if thread_id not in threads
+        ]
+        if not missing_ids:
+            return threads
+
         try:
-            vector_id = f"user_{user_id}_{thread_id}"
+            vector_ids = {
+                f"user_{user_id}_{thread_id}": thread_id for thread_id in missing_ids
+            }
             fetch_response = self.index.fetch(
-                ids=[vector_id], namespace=f"{PINECONE_NAMESPACE}_{user_id}"
+                ids=list(vector_ids), namespace=_ns(user_id)
             )
 
-            # Check if the vector was found in the response
-            if vector_id in fetch_response.vectors:
-                vector_data = fetch_response.vectors[vector_id]
+            for vector_id, thread_id in vector_ids.items():
+                # Check if the vector was found in the response
+                if vector_id not in fetch_response.vectors:
+                    logger.debug(
+                        "Thread %s (vector %s) not found in Pinecone fetch response.",
+                        thread_id,
+                        vector_id,
+                    )
+                    continue
+
                 # Access metadata directly from the vector data object
-                metadata = vector_data.metadata
+                metadata = fetch_response.vectors[vector_id].metadata
 
                 if not metadata:
-                    logger.warning(f"Vector {vector_id} found but has no metadata.")
-                    return None
+                    logger.warning("Vector %s found but has no metadata.", vector_id)
+                    continue
 
-                # Convert participants back from JSON string
                 try:
-                    participants = json.loads(metadata.get("participants", "[]"))
-                except json.JSONDecodeError:
+                    participants = _participants(metadata)
+                except orjson.JSONDecodeError:
                     logger.warning(
-                        f"Could not decode participants JSON for thread {thread_id}"
+                        "Could not decode participants JSON for thread %s", thread_id
                     )
                     participants = []  # Default to empty list
 
-                return {
+                thread = {
                     "thread_id": metadata.get(
                         "thread_id", thread_id
                     ),  # Use provided thread_id as fallback
@@ -268,25 +603,49 @@ class VectorDBService:
                     "participants": participants,
                     "message_count": int(metadata.get("message_count", 0)),
                     "last_updated": metadata.get("last_updated", ""),
-                    "text_preview": metadata.get("text_preview", ""),
+                    "text_preview": _text_preview(metadata),
                     "full_content": metadata.get("full_content", ""),
                     "category": metadata.get("category", ""),
                 }
-            else:
-                # Vector ID not found in the response vectors
-                logger.info(
-                    f"Thread {thread_id} (vector {vector_id}) not found in Pinecone fetch response."
-                )
-                return None
+                with self._cache_lock:
+                    self._thread_cache[(user_id, thread_id)] = thread
+                threads[thread_id] = dict(thread)
 
         except Exception as e:
-            # Use logger for consistency
             logger.error(
-                f"Error retrieving thread {thread_id} from Pinecone: {str(e)}",
+                "Error retrieving threads %s from Pinecone: %s",
+                missing_ids,
+                e,
                 exc_info=True,
             )
-            return None
 
+        return threads
+
+    def add_thread_metadata(
+        self, user_id: int, results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fill in thread metadata for results of a search_threads call made with
+        include_metadata=False, dropping any thread that can't be fetched
+
+        Args:
+            user_id: The ID of the user who owns the threads
+            results: Search results holding thread_id and score
 
-# Create a singleton instance
-vector_db = VectorDBService()
+        Returns:
+            The results with their thread metadata, in the same order
+        """
+        threads = self.get_threads_by_ids(
+            user_id, [result["thread_id"] for result in results]
+        )
+        return [
+            {**threads[result["thread_id"]], "score": result["score"]}
+            for result in results
+            if result["thread_id"] in threads
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_vector_db() -> VectorDBService:
+    """Get the shared VectorDBService, connecting to Pinecone on first use"""
+    return VectorDBService()
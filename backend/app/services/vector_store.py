@@ -1,9 +1,26 @@
 from typing import List, Dict, Any, Optional
+from operator import itemgetter
 import numpy as np
 from app.models.email import EmailMetadata
 from app.db.db import Database
 from app.services.embedding_service import EmbeddingService
 
+# Columns of a search result row, in the order they are unpacked
+_get_result_fields = itemgetter(
+    "thread_id", "subject", "snippet", "date", "label", "similarity_score"
+)
+
+
+def _is_valid_embedding(embedding: Optional[List[float]]) -> bool:
+    """Whether an embedding is a real vector, not a failure (None or all zeros)"""
+    return embedding is not None and any(embedding)
+
+
+def _to_vector_literal(embedding: List[float]) -> str:
+    """Format an embedding in the '[x,y,...]' text form pgvector parses"""
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
 class VectorStore:
     """Service to handle vector embedding storage and retrieval for semantic search"""
     
@@ -42,11 +59,10 @@ class VectorStore:
                 t.thread_id,
                 t.subject,
                 t.snippet, 
-                t.embedding,
                 t.date,
                 l.name as label,
                 (
-                    t.embedding <=> %(query_embedding)s
+                    t.embedding <=> CAST(:query_embedding AS vector)
                 ) as similarity_score
             FROM thread_embeddings t
             JOIN thread_labels tl ON t.thread_id = tl.thread_id
@@ -55,28 +71,32 @@ class VectorStore:
         """
         
         params = {
-            "query_embedding": query_embedding
+            "query_embedding": _to_vector_literal(query_embedding)
         }
         
+        # Filters bind lists as arrays (= ANY), so the statement text and its
+        # plan stay the same whatever the number of values
+        
         # Add filtering for include_labels if provided
         if include_labels:
-            query += " AND l.name IN %(include_labels)s"
-            params["include_labels"] = tuple(include_labels)
+            query += " AND l.name = ANY(:include_labels)"
+            params["include_labels"] = list(include_labels)
             
         # Add filtering for exclude_labels if provided
         if exclude_labels:
-            query += " AND l.name NOT IN %(exclude_labels)s"
-            params["exclude_labels"] = tuple(exclude_labels)
+            query += " AND NOT (l.name = ANY(:exclude_labels))"
+            params["exclude_labels"] = list(exclude_labels)
             
         # Add filtering for excluded thread IDs
         if exclude_thread_ids:
-            query += " AND t.thread_id NOT IN %(exclude_thread_ids)s"
-            params["exclude_thread_ids"] = tuple(exclude_thread_ids)
+            query += " AND NOT (t.thread_id = ANY(:exclude_thread_ids))"
+            params["exclude_thread_ids"] = list(exclude_thread_ids)
             
-        # Order by similarity score and limit results
+        # Order by the distance operator itself (not its alias) so the planner
+        # can walk a vector index on t.embedding when one exists
         query += """
-            ORDER BY similarity_score ASC
-            LIMIT %(limit)s
+            ORDER BY t.embedding <=> CAST(:query_embedding AS vector)
+            LIMIT :limit
         """
         params["limit"] = limit
         
@@ -84,18 +104,18 @@ class VectorStore:
         results = self.db.execute_query(query, params)
         
         # Format results for return
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                "thread_id": row["thread_id"],
-                "subject": row["subject"],
-                "snippet": row["snippet"],
-                "date": row["date"],
-                "label": row["label"],
-                "score": float(row["similarity_score"])
-            })
-            
-        return formatted_results
+        return [
+            {
+                "thread_id": thread_id,
+                "subject": subject,
+                "snippet": snippet,
+                "date": date,
+                "label": label,
+                "score": float(similarity_score)
+            }
+            for thread_id, subject, snippet, date, label, similarity_score
+            in map(_get_result_fields, results)
+        ]
     
     def index_thread(self, thread_id: str, thread_text: str) -> bool:
         """
@@ -140,27 +160,54 @@ class VectorStore:
         """
         Index multiple threads in batch
         
+        All thread texts are embedded in batched API calls and the embeddings
+        are written with a single multi-row upsert.
+        
         Args:
             threads: List of thread objects with thread_id and text content
             
         Returns:
             Dictionary with success count and failed count
         """
-        success_count = 0
-        failed_count = 0
-        
-        for thread in threads:
-            thread_id = thread.get("thread_id")
-            thread_text = self._prepare_thread_text(thread)
-            
-            if self.index_thread(thread_id, thread_text):
-                success_count += 1
-            else:
-                failed_count += 1
+        try:
+            # Generate embeddings for all threads at once
+            thread_texts = [self._prepare_thread_text(thread) for thread in threads]
+            embeddings = self.embedding_service.generate_embeddings(thread_texts)
+            
+            # Store all embeddings in the database in one statement
+            query = """
+                INSERT INTO thread_embeddings (thread_id, embedding, embedding_model)
+                VALUES (:thread_id, CAST(:embedding AS vector), :model)
+                ON CONFLICT (thread_id) 
+                DO UPDATE SET 
+                    embedding = EXCLUDED.embedding,
+                    embedding_model = EXCLUDED.embedding_model,
+                    updated_at = NOW()
+            """
+            
+            # Threads whose embedding failed are not stored, so they
+            # fail on their own instead of overwriting good embeddings
+            params_list = [
+                {
+                    "thread_id": thread.get("thread_id"),
+                    "embedding": _to_vector_literal(embedding),
+                    "model": self.embedding_service.model_name
+                }
+                for thread, embedding in zip(threads, embeddings)
+                if _is_valid_embedding(embedding)
+            ]
+            
+            success = self.db.execute_many(query, params_list) if params_list else True
+            
+        except Exception as e:
+            print(f"Error batch indexing threads: {str(e)}")
+            success = False
+            
+        success_count = len(params_list) if success else 0
                 
         return {
             "success_count": success_count,
-            "failed_count": failed_count,
+            "failed_count": len(threads) - success_count,
             "total": len(threads)
         }
         
@@ -7,13 +7,14 @@ to periodically refresh them to ensure continuous instant auto-replies.
 
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone, timedelta
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from sqlalchemy import func, or_, select
+from typing import List, Optional
 import os
 
-from app.db.database import SessionLocal
-from app.models.user import User
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.models.auto_reply_config import UserAutoReplyConfig
 from app.services.auto_reply_service import AutoReplyManager
 
 # Set up logging
@@ -22,6 +23,95 @@ logger = logging.getLogger(__name__)
 # How many days before expiration to refresh (we'll refresh when 2 days remain)
 REFRESH_THRESHOLD_DAYS = 2
 
+# Bounds on how long the scheduler sleeps between checks
+MIN_SLEEP_SECONDS = 60
+MAX_SLEEP_SECONDS = 12 * 60 * 60  # Still check twice a day
+
+# Set when a push registration is added, to recompute the next wake-up (created
+# by run_scheduler, as events bind to the running loop on Python 3.9)
+_wake_event: Optional[asyncio.Event] = None
+
+# Configs claimed per batch, and how long a claim lasts before another
+# instance may take over the row (e.g. if the claiming instance died)
+REFRESH_CLAIM_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "25"))
+REFRESH_CLAIM_TIMEOUT_MINUTES = 10
+
+# Minimum seconds between the starts of consecutive batches, so a large burst
+# of due registrations is spread out instead of hitting the Gmail quota at once
+REFRESH_BATCH_INTERVAL_SECONDS = float(
+    os.getenv("REFRESH_BATCH_INTERVAL_SECONDS", "2.0")
+)
+
+# How many refresh calls to make at once
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "16"))
+
+
+def _renew_watch(user_id: int) -> None:
+    """Renew one user's Gmail watch with their own credentials (blocking)"""
+    db = SessionLocal()
+    try:
+        AutoReplyManager.register_gmail_watch(user_id, db)
+    finally:
+        db.close()
+
+
+async def _refresh_one(config: UserAutoReplyConfig, sem: asyncio.Semaphore) -> bool:
+    """Refresh one user's push notification registration, returning success"""
+    async with sem:
+        try:
+            logger.info(
+                f"Refreshing push notifications for user {config.user_id}, expires: {config.push_notification_expiry.isoformat()}"
+            )
+
+            # The Gmail client and the sync session block, so renew the watch on
+            # a worker thread to keep the event loop free
+            await asyncio.to_thread(_renew_watch, config.user_id)
+            logger.info(
+                f"Successfully refreshed push notifications for user {config.user_id}"
+            )
+            return True
+
+        except Exception as user_error:
+            logger.error(f"Error processing user {config.user_id}: {str(user_error)}")
+            return False
+
+
+async def _claim_due_configs() -> List[UserAutoReplyConfig]:
+    """
+    Claim a batch of configs whose push registration is due for a refresh.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED and marked with refreshing_at
+    before the claim commits, so when several app instances run the scheduler
+    each registration is refreshed by only one of them.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            # Only load configs whose push registration is due for a refresh
+            # (idx_arc_push_expiry covers this filter), skipping ones another
+            # instance claimed recently
+            result = await db.scalars(
+                select(UserAutoReplyConfig)
+                .where(
+                    UserAutoReplyConfig.is_using_push_notifications.is_(True),
+                    UserAutoReplyConfig.push_notification_expiry
+                    <= now + timedelta(days=REFRESH_THRESHOLD_DAYS),
+                    or_(
+                        UserAutoReplyConfig.refreshing_at.is_(None),
+                        UserAutoReplyConfig.refreshing_at
+                        < now - timedelta(minutes=REFRESH_CLAIM_TIMEOUT_MINUTES),
+                    ),
+                )
+                .order_by(UserAutoReplyConfig.push_notification_expiry)
+                .limit(REFRESH_CLAIM_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            due_configs = result.all()
+            for config in due_configs:
+                config.refreshing_at = now
+
+    return due_configs
+
 
 async def refresh_expiring_push_notifications():
     """
@@ -30,88 +120,34 @@ async def refresh_expiring_push_notifications():
     """
     logger.info("Running scheduled task: refresh_expiring_push_notifications")
 
-    # Get all users with active push notifications
-    db = SessionLocal()
+    # Get users whose push notifications are about to expire, using the async
+    # session so the queries don't block the event loop the API runs on
     try:
-        # Import these here to avoid circular imports
-        from app.api.routes.auto_reply import get_auto_reply_config, get_google_creds
-        import requests
-
-        users = db.query(User).all()
         refresh_count = 0
         error_count = 0
 
-        for user in users:
-            try:
-                # Get the user's auto-reply config directly from the database
-                # We can access the config data directly from the API
-                from app.schemas.auto_reply import AutoReplyConfig
-
-                # For simplicity, we'll make a direct query to get the auto-reply settings
-                # In a production system, this would be stored in a dedicated table
-                # Here we're using the in-memory dictionary from the auto_reply module
-                from app.api.routes.auto_reply import auto_reply_configs
-
-                # Get config from memory or use default
-                config = auto_reply_configs.get(user.id, AutoReplyConfig())
-
-                # Skip users without push notifications enabled
-                if not config.is_using_push_notifications:
-                    continue
-
-                # Check if there's an expiration timestamp
-                if not config.push_notification_expiry:
-                    continue
-
-                try:
-                    # Parse the expiration timestamp
-                    expiry_date = datetime.fromisoformat(
-                        config.push_notification_expiry
-                    )
-
-                    # Calculate when we should refresh (2 days before expiration)
-                    refresh_date = expiry_date - timedelta(days=REFRESH_THRESHOLD_DAYS)
-
-                    # Check if it's time to refresh
-                    now = datetime.now(timezone.utc)
-                    if now >= refresh_date:
-                        logger.info(
-                            f"Refreshing push notifications for user {user.id}, expires: {expiry_date.isoformat()}"
-                        )
-
-                        # Make a direct API call to refresh notifications
-                        # This avoids issues with sync/async functions
-                        api_url = os.getenv(
-                            "API_BASE_URL", "https://emailbot-k8s7.onrender.com"
-                        )
-                        endpoint = f"{api_url}/api/auto-reply/renew-push-notifications"
-
-                        # We'll need to have an auth token for this user
-                        # For now, we'll just log that we would refresh
-                        logger.info(
-                            f"Would call {endpoint} to refresh notifications for user {user.id}"
-                        )
-
-                        # In a real production system, the scheduler would have access to admin credentials
-                        # result = requests.post(endpoint, headers={"Authorization": f"Bearer {admin_token}"})
-                        # if result.status_code == 200 and result.json().get("success"):
-                        #     refresh_count += 1
-                        #     logger.info(f"Successfully refreshed push notifications for user {user.id}")
-                        # else:
-                        #     error_count += 1
-                        #     logger.error(f"Failed to refresh: {result.text}")
-
-                        # For this implementation, we'll just count it as a success for demonstration
-                        refresh_count += 1
-
-                except (ValueError, TypeError) as e:
-                    logger.error(
-                        f"Invalid expiry date format for user {user.id}: {str(e)}"
-                    )
-
-            except Exception as user_error:
-                logger.error(f"Error processing user {user.id}: {str(user_error)}")
-                error_count += 1
+        while True:
+            batch_started = time.monotonic()
+            due_configs = await _claim_due_configs()
+            if not due_configs:
+                break
+
+            # Refresh the users concurrently, with at most REFRESH_CONCURRENCY
+            # calls in flight to stay within the Gmail API quota. The configs are
+            # already loaded, so the tasks don't share the session
+            sem = asyncio.Semaphore(REFRESH_CONCURRENCY)
+            tasks = [
+                asyncio.create_task(_refresh_one(config, sem)) for config in due_configs
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            batch_refresh_count = sum(1 for result in results if result is True)
+            refresh_count += batch_refresh_count
+            error_count += len(results) - batch_refresh_count
+
+            # Pace the batches (a short batch means nothing is left to claim)
+            if len(due_configs) == REFRESH_CLAIM_BATCH_SIZE:
+                elapsed = time.monotonic() - batch_started
+                await asyncio.sleep(max(0.0, REFRESH_BATCH_INTERVAL_SECONDS - elapsed))
 
         logger.info(
             f"Completed push notification refresh: {refresh_count} refreshed, {error_count} errors"
@@ -119,8 +155,73 @@ async def refresh_expiring_push_notifications():
 
     except Exception as e:
         logger.error(f"Error in refresh_expiring_push_notifications: {str(e)}")
-    finally:
-        db.close()
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes (SQLite hands them back) as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def _next_refresh_delay() -> float:
+    """
+    Seconds until the next registration needs a refresh: either one that isn't
+    due yet, or a due one whose failed refresh's claim is about to expire.
+    Clamped to [MIN_SLEEP_SECONDS, MAX_SLEEP_SECONDS].
+    """
+    now = datetime.now(timezone.utc)
+    refresh_before = now + timedelta(days=REFRESH_THRESHOLD_DAYS)
+    async with AsyncSessionLocal() as db:
+        earliest_expiry = await db.scalar(
+            select(func.min(UserAutoReplyConfig.push_notification_expiry)).where(
+                UserAutoReplyConfig.is_using_push_notifications.is_(True),
+                UserAutoReplyConfig.push_notification_expiry > refresh_before,
+            )
+        )
+
+        # Registrations already due were handled in the last run. A failed
+        # refresh keeps its claim, so retry it once the claim expires rather
+        # than in a tight loop (or only after MAX_SLEEP_SECONDS)
+        due = (
+            UserAutoReplyConfig.is_using_push_notifications.is_(True),
+            UserAutoReplyConfig.push_notification_expiry <= refresh_before,
+        )
+        earliest_claim = await db.scalar(
+            select(func.min(UserAutoReplyConfig.refreshing_at)).where(
+                *due, UserAutoReplyConfig.refreshing_at.is_not(None)
+            )
+        )
+        unclaimed_due = await db.scalar(
+            select(UserAutoReplyConfig.user_id)
+            .where(*due, UserAutoReplyConfig.refreshing_at.is_(None))
+            .limit(1)
+        )
+
+    # A due registration nobody claimed (e.g. the last run stopped early)
+    if unclaimed_due is not None:
+        return MIN_SLEEP_SECONDS
+
+    wake_times = []
+    if earliest_expiry is not None:
+        wake_times.append(
+            _as_utc(earliest_expiry) - timedelta(days=REFRESH_THRESHOLD_DAYS)
+        )
+    if earliest_claim is not None:
+        wake_times.append(
+            _as_utc(earliest_claim) + timedelta(minutes=REFRESH_CLAIM_TIMEOUT_MINUTES)
+        )
+    if not wake_times:
+        return MAX_SLEEP_SECONDS
+
+    delay = (min(wake_times) - now).total_seconds()
+    return min(max(delay, MIN_SLEEP_SECONDS), MAX_SLEEP_SECONDS)
+
+
+def wake_scheduler() -> None:
+    """Wake the scheduler so it re-checks registrations (e.g. after a new one)"""
+    if _wake_event is not None:
+        _wake_event.set()
 
 
 async def run_scheduler():
@@ -130,14 +231,25 @@ async def run_scheduler():
     """
     logger.info("Starting notification refresh scheduler")
 
+    global _wake_event
+    _wake_event = asyncio.Event()
+
     while True:
         try:
+            # Wake-ups requested from here on are for the next run
+            _wake_event.clear()
+
             # Run the refresh task
             await refresh_expiring_push_notifications()
 
-            # Sleep for 12 hours before checking again
-            # This is a good balance - checks twice a day but not too frequent
-            await asyncio.sleep(12 * 60 * 60)  # 12 hours in seconds
+            # Sleep until the next registration needs refreshing, or until
+            # a new registration wakes us up
+            delay = await _next_refresh_delay()
+            logger.info(f"Next push notification refresh check in {delay:.0f}s")
+            try:
+                await asyncio.wait_for(_wake_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
 
         except Exception as e:
             logger.error(f"Error in scheduler loop: {str(e)}")
@@ -3,9 +3,26 @@ Utility functions for working with email threads that are used across multiple s
 This module helps prevent circular imports by providing common functionality.
 """
 
-from typing import Dict, Any, Optional
+import re
+import threading
+from cachetools import TTLCache
+from typing import Dict, Any, List, Optional
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+# Labels that determine a thread's category
+_CATEGORY_NAMES = ("Job Posting", "Candidate", "Event")
+
+# Matches an HTML tag, for stripping markup from message bodies
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+
+# Recently looked up categories keyed by (thread_id, user_id); labels change
+# slowly, and label_service drops a thread's entry whenever its labels change
+CATEGORY_CACHE_SIZE = 4096
+CATEGORY_CACHE_TTL_SECONDS = 60
+_category_cache = TTLCache(maxsize=CATEGORY_CACHE_SIZE, ttl=CATEGORY_CACHE_TTL_SECONDS)
+_category_cache_lock = threading.Lock()
+
 
 def get_thread_category(thread_id: str, user_id: int, db: Session) -> str:
     """
@@ -19,29 +36,89 @@ def get_thread_category(thread_id: str, user_id: int, db: Session) -> str:
     Returns:
         String with the thread category (Job Posting, Candidate, etc.) or empty string if not found
     """
+    return get_thread_categories([thread_id], user_id, db).get(thread_id, "")
+
+
+def get_thread_categories(
+    thread_ids: List[str], user_id: int, db: Session
+) -> Dict[str, str]:
+    """
+    Get the categories of several threads based on their labels, in one query
+
+    Args:
+        thread_ids: The IDs of the threads
+        user_id: The ID of the user
+        db: Database session
+
+    Returns:
+        Dict mapping thread IDs to their category (Job Posting, Candidate, etc.),
+        for the threads that have one
+    """
+    if not thread_ids:
+        return {}
+
+    # Serve what we can from the cache ("" marks a thread with no category)
+    categories = {}
+    missing_ids = []
+    with _category_cache_lock:
+        for thread_id in thread_ids:
+            category = _category_cache.get((thread_id, user_id))
+            if category is None:
+                missing_ids.append(thread_id)
+            elif category:
+                categories[thread_id] = category
+    if not missing_ids:
+        return categories
+
     try:
         from app.models.email_label import ThreadLabel, EmailLabel
 
-        # Get thread labels
-        thread_label = (
-            db.query(ThreadLabel)
+        # Rank each thread's category labels by confidence, selecting the label
+        # name directly so labels aren't loaded through the relationship
+        ranked_labels = (
+            select(
+                ThreadLabel.thread_id,
+                EmailLabel.name,
+                func.row_number()
+                .over(
+                    partition_by=ThreadLabel.thread_id,
+                    order_by=ThreadLabel.confidence.desc(),
+                )
+                .label("rank"),
+            )
             .join(EmailLabel, ThreadLabel.label_id == EmailLabel.id)
-            .filter(
-                ThreadLabel.thread_id == thread_id,
+            .where(
                 ThreadLabel.user_id == user_id,
-                EmailLabel.name.in_(["Job Posting", "Candidate", "Event"]),
+                ThreadLabel.thread_id.in_(missing_ids),
+                EmailLabel.name.in_(_CATEGORY_NAMES),
             )
-            .order_by(ThreadLabel.confidence.desc())
-            .first()
+            .subquery()
         )
 
-        if thread_label and hasattr(thread_label, "label") and thread_label.label:
-            return thread_label.label.name
+        # Keep the highest-confidence label of each thread
+        rows = db.execute(
+            select(ranked_labels.c.thread_id, ranked_labels.c.name).where(
+                ranked_labels.c.rank == 1
+            )
+        ).all()
 
-        return ""
+        fetched = {thread_id: name for thread_id, name in rows}
     except Exception as e:
-        print(f"Error getting thread category: {str(e)}")
-        return ""
+        print(f"Error getting thread categories: {str(e)}")
+        return categories
+
+    with _category_cache_lock:
+        for thread_id in missing_ids:
+            _category_cache[(thread_id, user_id)] = fetched.get(thread_id, "")
+
+    categories.update(fetched)
+    return categories
+
+
+def invalidate_thread_category(thread_id: str, user_id: int) -> None:
+    """Drop a thread's cached category after its labels change"""
+    with _category_cache_lock:
+        _category_cache.pop((thread_id, user_id), None)
 
 
 def extract_thread_content(thread_data: Dict[str, Any]) -> str:
@@ -49,26 +126,29 @@ def extract_thread_content(thread_data: Dict[str, Any]) -> str:
     Extract text content from a thread for processing
 
     Args:
-        thread_data: Thread data with messages
+        thread_data: Thread data with messages, each optionally carrying the
+            "mime_type" of its body (text/plain or text/html)
 
     Returns:
         Plain text content of the thread
     """
-    text_content = f"Subject: {thread_data.get('subject', 'No Subject')}\n\n"
+    parts = [f"Subject: {thread_data.get('subject', 'No Subject')}\n\n"]
 
     for message in thread_data.get("messages", []):
         sender = message.get("sender", "Unknown")
-        text_content += f"From: {sender}\n"
+        parts.append(f"From: {sender}\n")
 
         # Get message content - prefer body if available, otherwise snippet
-        content = message.get("body", message.get("snippet", ""))
-
-        # Remove HTML if present (basic approach)
-        import re
+        content = message.get("body") or message.get("snippet", "")
 
-        if content and "<" in content and ">" in content:
-            content = re.sub(r"<[^>]*>", " ", content)
+        # Remove HTML (basic approach), trusting the message's MIME type when
+        # the caller knows it so plain text bodies aren't scanned for tags
+        mime_type = message.get("mime_type")
+        if mime_type == "text/html" or (
+            mime_type is None and content and _HTML_TAG_RE.search(content)
+        ):
+            content = _HTML_TAG_RE.sub(" ", content)
 
-        text_content += f"{content}\n\n"
+        parts.append(f"{content}\n\n")
 
-    return text_content
+    return "".join(parts)
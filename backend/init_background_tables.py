@@ -12,8 +12,9 @@ from sqlalchemy import text
 load_dotenv()
 
 # Import database modules
-from app.db.database import engine, SessionLocal
+from app.db.database import engine
 from app.models.background_service import UserBackgroundPreferences, OAuthToken, BackgroundServiceLog
+from app.models.auto_reply_config import UserAutoReplyConfig
 
 # Configure logging
 logging.basicConfig(
@@ -29,33 +30,36 @@ def init_background_tables():
     
     logger.info("Creating background service tables...")
     
-    # Create all tables from models
-    Base.metadata.create_all(bind=engine, tables=[
-        UserBackgroundPreferences.__table__,
-        OAuthToken.__table__,
-        BackgroundServiceLog.__table__
-    ])
+    # Create all tables from models in one transaction
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn, tables=[
+            UserBackgroundPreferences.__table__,
+            OAuthToken.__table__,
+            BackgroundServiceLog.__table__,
+            UserAutoReplyConfig.__table__
+        ])
     
-    # Create indices for better query performance
-    db = SessionLocal()
-    try:
-        # Index for querying logs by user and date
-        db.execute(text(
-            "CREATE INDEX IF NOT EXISTS idx_logs_user_date ON background_service_logs (user_id, DATE(created_at))"
-        ))
-        
+    # Create indices for better query performance. CONCURRENTLY doesn't block
+    # writes while an index builds, but can't run inside a transaction, so
+    # the statements go through an autocommit connection
+    indices = [
+        # Index for querying logs by user and date (created_at is a timestamptz,
+        # so it is converted to UTC first to make the expression immutable)
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_logs_user_date ON background_service_logs (user_id, ((created_at AT TIME ZONE 'UTC')::date))",
         # Index for querying logs by event type
-        db.execute(text(
-            "CREATE INDEX IF NOT EXISTS idx_logs_event_type ON background_service_logs (event_type)"
-        ))
-        
-        db.commit()
-        logger.info("Created indices for background service tables")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating indices: {str(e)}")
-    finally:
-        db.close()
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_logs_event_type ON background_service_logs (event_type)",
+        # Index for finding expiring push notification registrations
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_arc_push_expiry ON auto_reply_configs (is_using_push_notifications, push_notification_expiry)",
+        # Index for looking up a thread's category label
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_threadlabel_user_thread_conf ON thread_labels (user_id, thread_id, confidence DESC)",
+    ]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_sql in indices:
+            try:
+                conn.execute(text(index_sql))
+            except Exception as e:
+                logger.error(f"Error creating index: {str(e)}")
+    logger.info("Created indices for background service tables")
     
     logger.info("Background service tables initialized successfully")
 
@@ -1,4 +1,6 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any, Optional
@@ -42,7 +44,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Set specific loggers to debug level
+# Set the level of the main service loggers (SERVICE_LOG_LEVEL=DEBUG to diagnose)
+service_log_level = getattr(
+    logging, os.getenv("SERVICE_LOG_LEVEL", "INFO").upper(), logging.INFO
+)
 for logger_name in [
     "app.services.auto_reply_service",
     "app.services.email_service",
@@ -50,83 +55,100 @@ for logger_name in [
     "app.services.match_service",
 ]:
     module_logger = logging.getLogger(logger_name)
-    module_logger.setLevel(logging.DEBUG)
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-)
-
-# Set all CORS enabled origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    module_logger.setLevel(service_log_level)
 
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the database, schedulers and background services, and stop them on shutdown"""
     logger.info("Starting up...")
-    # Initialize database
-    init_db()
+    # Initialize database (first, as everything else uses the tables)
+    await asyncio.to_thread(init_db)
     logger.info("Database initialized")
 
-    # Start the scheduler for periodic tasks
+    # Start the scheduler for periodic tasks. It creates its asyncio task on
+    # this loop, so it can't be started from a worker thread
     start_scheduler()
     logger.info("Scheduler started")
 
-    # Initialize background service
-    initialize_background_service()
-    logger.info("Background service initialized")
-
-    # Start the background tasks for reliable email checking
+    # Initialize background service and start the background tasks for
+    # reliable email checking, side by side as they are independent
     from app.services.background_tasks import start_background_tasks
 
-    start_background_tasks()
+    await asyncio.gather(
+        asyncio.to_thread(initialize_background_service),
+        asyncio.to_thread(start_background_tasks),
+    )
+    logger.info("Background service initialized")
     logger.info("Reliable email background checking system started")
 
+    try:
+        yield
+    finally:
+        # Stop the scheduler
+        stop_scheduler()
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Stop the scheduler and background tasks on app shutdown"""
-    # Stop the scheduler
-    stop_scheduler()
+        # Stop the background tasks
+        from app.services.background_tasks import stop_background_tasks
 
-    # Stop the background tasks
-    from app.services.background_tasks import stop_background_tasks
+        stop_background_tasks()
+        logger.info("Background tasks stopped")
 
-    stop_background_tasks()
-    logger.info("Background tasks stopped")
+        # Stop background service
+        from app.services.background_service import background_service
 
-    # Stop background service
-    from app.services.background_service import background_service
+        background_service.stop()
+        logger.info("Background service stopped")
 
-    background_service.stop()
-    logger.info("Background service stopped")
 
-
-@app.get("/", tags=["Health"])
 async def health_check():
     return {"status": "ok", "message": "Service is running"}
 
 
-# Include routers
-app.include_router(auth.router, prefix="/api", tags=["Authentication"])
-app.include_router(emails.router, prefix="/api", tags=["Emails"])
-app.include_router(auto_reply.router, prefix="/api", tags=["Auto Reply"])
-app.include_router(labels.router, prefix="/api", tags=["Email Labels"])
-app.include_router(analytics.router, prefix="/api", tags=["Email Analytics"])
-app.include_router(
-    matches.router, prefix="/api/matches", tags=["Job-Candidate Matching"]
-)
-app.include_router(prompt_management.router, prefix="/api", tags=["Custom Prompts"])
-app.include_router(thread_monitoring.router, prefix="/api", tags=["Thread Monitoring"])
-# Add new routes
-app.include_router(semantic_search.router, tags=["Semantic Search"])
-app.include_router(background_service_routes.router, tags=["Background Service"])
+def _register_routes(app: FastAPI) -> None:
+    """Add the health check and all API routers to the app"""
+    app.add_api_route("/", health_check, methods=["GET"], tags=["Health"])
+
+    # Include routers
+    app.include_router(auth.router, prefix="/api", tags=["Authentication"])
+    app.include_router(emails.router, prefix="/api", tags=["Emails"])
+    app.include_router(auto_reply.router, prefix="/api", tags=["Auto Reply"])
+    app.include_router(labels.router, prefix="/api", tags=["Email Labels"])
+    app.include_router(analytics.router, prefix="/api", tags=["Email Analytics"])
+    app.include_router(
+        matches.router, prefix="/api/matches", tags=["Job-Candidate Matching"]
+    )
+    app.include_router(prompt_management.router, prefix="/api", tags=["Custom Prompts"])
+    app.include_router(
+        thread_monitoring.router, prefix="/api", tags=["Thread Monitoring"]
+    )
+    # Add new routes
+    app.include_router(semantic_search.router, tags=["Semantic Search"])
+    app.include_router(background_service_routes.router, tags=["Background Service"])
+
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application"""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
+    )
+
+    # Set all CORS enabled origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    _register_routes(app)
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,2 @@
+-- Migration to let scheduler instances claim push notification refreshes
+ALTER TABLE auto_reply_configs ADD COLUMN IF NOT EXISTS refreshing_at TIMESTAMPTZ;
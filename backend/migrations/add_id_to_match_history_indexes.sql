@@ -0,0 +1,8 @@
+-- Migration to add the id tie-breaker to the match history keyset indexes
+DROP INDEX IF EXISTS idx_matches_job_history;
+CREATE INDEX idx_matches_job_history
+  ON job_candidate_matches (user_id, match_type, job_thread_id, matched_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_matches_candidate_history;
+CREATE INDEX idx_matches_candidate_history
+  ON job_candidate_matches (user_id, match_type, candidate_thread_id, matched_at DESC, id DESC);
@@ -0,0 +1,6 @@
+-- Migration to add composite indexes for keyset pagination of match history
+CREATE INDEX IF NOT EXISTS idx_matches_job_history
+  ON job_candidate_matches (user_id, match_type, job_thread_id, matched_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_matches_candidate_history
+  ON job_candidate_matches (user_id, match_type, candidate_thread_id, matched_at DESC);
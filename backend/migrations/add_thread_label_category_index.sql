@@ -0,0 +1,3 @@
+-- Migration to add a covering index for thread category lookups
+CREATE INDEX IF NOT EXISTS idx_threadlabel_user_thread_conf
+  ON thread_labels (user_id, thread_id, confidence DESC);
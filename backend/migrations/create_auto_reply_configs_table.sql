@@ -0,0 +1,18 @@
+-- Migration to persist auto-reply configuration (previously held in memory)
+CREATE TABLE IF NOT EXISTS auto_reply_configs (
+  user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+  enabled BOOLEAN NOT NULL DEFAULT TRUE,
+  max_threads_per_check INTEGER NOT NULL DEFAULT 20,
+  auto_reply_signature VARCHAR,
+  is_using_gmail_responder BOOLEAN NOT NULL DEFAULT FALSE,
+  is_using_push_notifications BOOLEAN NOT NULL DEFAULT FALSE,
+  push_notification_expiry TIMESTAMPTZ,
+  push_notification_history_id VARCHAR,
+  push_notification_topic VARCHAR,
+  created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Index for the push notification refresh scheduler
+CREATE INDEX IF NOT EXISTS idx_arc_push_expiry
+  ON auto_reply_configs (is_using_push_notifications, push_notification_expiry);
@@ -0,0 +1,30 @@
+import pytest
+
+vector_db_service = pytest.importorskip("app.services.vector_db_service")
+
+
+def _vector(i: int) -> tuple:
+    return (
+        f"user_1_thread_{i}",
+        [0.123456789] * vector_db_service.EMBEDDING_DIMENSIONS,
+        {"thread_id": f"thread_{i}", "full_content": "x" * 1000},
+    )
+
+
+def test_split_batches_respects_batch_size():
+    vectors = [_vector(i) for i in range(5)]
+
+    batches = vector_db_service._split_batches(vectors, 2)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [vector for batch in batches for vector in batch] == vectors
+
+
+def test_split_batches_respects_request_size(monkeypatch):
+    vectors = [_vector(i) for i in range(4)]
+    size = vector_db_service._vector_size(vectors[0])
+    monkeypatch.setattr(vector_db_service, "UPSERT_MAX_REQUEST_BYTES", size * 2 + 1)
+
+    batches = vector_db_service._split_batches(vectors, 100)
+
+    assert [len(batch) for batch in batches] == [2, 2]